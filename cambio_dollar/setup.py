@@ -0,0 +1,25 @@
+"""Extensiones opcionales; la configuración del paquete vive en ``pyproject.toml``."""
+
+import sys
+
+from setuptools import Extension, setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:  # pragma: no cover - sin Cython se instala la versión pura
+    ext_modules = []
+else:
+    ext_modules = cythonize(
+        [
+            Extension(
+                "cambio_dollar._fitline",
+                ["src/cambio_dollar/_fitline.pyx"],
+                extra_compile_args=[] if sys.platform == "win32" else ["-O3"],
+                # Sin compilador la instalación continúa con numba/NumPy.
+                optional=True,
+            )
+        ],
+        compiler_directives={"language_level": "3"},
+    )
+
+setup(ext_modules=ext_modules)
@@ -0,0 +1,31 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+# Copyright (c) 2025 Cambio Dollar Project
+# All rights reserved.
+#
+# This software is licensed under the MIT License.
+# See LICENSE file for more details.
+
+"""Versión compilada de ``_kernels._fit_line_loop`` (misma pasada de Welford)."""
+
+from libc.math cimport sqrt
+
+
+def fit_line(const double[::1] x, const double[::1] y):
+    cdef Py_ssize_t i, n = x.shape[0]
+    cdef double mean_x = 0.0, mean_y = 0.0
+    cdef double sxx = 0.0, sxy = 0.0, syy = 0.0
+    cdef double dx, dy, count, slope, intercept, residual_ss
+    with nogil:
+        for i in range(n):
+            count = i + 1
+            dx = x[i] - mean_x
+            dy = y[i] - mean_y
+            mean_x += dx / count
+            mean_y += dy / count
+            sxx += dx * (x[i] - mean_x)
+            sxy += dx * (y[i] - mean_y)
+            syy += dy * (y[i] - mean_y)
+    slope = sxy / sxx if sxx > 0.0 else 0.0
+    intercept = mean_y - slope * mean_x
+    residual_ss = max(syy - slope * sxy, 0.0)
+    return intercept, slope, sqrt(residual_ss / n)
@@ -0,0 +1,86 @@
+# Copyright (c) 2025 Cambio Dollar Project
+# All rights reserved.
+#
+# This software is licensed under the MIT License.
+# See LICENSE file for more details.
+
+"""Núcleos numéricos compartidos por forecast y features.
+
+El ajuste lineal usa, por orden de preferencia, la extensión Cython ``_fitline``
+compilada al instalar (cuando hay compilador), el mismo bucle compilado por numba
+(extra ``speedups``) o la versión equivalente en NumPy.
+"""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+try:  # extensión opcional, compilada por setup.py cuando hay compilador disponible.
+    from ._fitline import fit_line as _fit_line_compiled
+except ImportError:  # pragma: no cover - depende del entorno
+    _fit_line_compiled = None
+
+try:  # numba es opcional (extra ``speedups``).
+    from numba import njit
+except ImportError:  # pragma: no cover - depende del entorno
+    njit = None
+
+
+def _fit_line_loop(x: np.ndarray, y: np.ndarray) -> tuple[float, float, float]:
+    # Una sola pasada con actualizaciones de Welford: medias y co-momentos centrados
+    # sin la cancelación de sxx - n * mean_x**2 ni una segunda lectura de x/y.
+    n = x.shape[0]
+    mean_x = 0.0
+    mean_y = 0.0
+    sxx = 0.0
+    sxy = 0.0
+    syy = 0.0
+    for i in range(n):
+        count = i + 1
+        dx = x[i] - mean_x
+        dy = y[i] - mean_y
+        mean_x += dx / count
+        mean_y += dy / count
+        sxx += dx * (x[i] - mean_x)
+        sxy += dx * (y[i] - mean_y)
+        syy += dy * (y[i] - mean_y)
+    slope = sxy / sxx if sxx > 0.0 else 0.0
+    intercept = mean_y - slope * mean_x
+    residual_ss = max(syy - slope * sxy, 0.0)
+    return intercept, slope, math.sqrt(residual_ss / n)
+
+
+def _fit_line_numpy(x: np.ndarray, y: np.ndarray) -> tuple[float, float, float]:
+    mean_x = x.mean()
+    mean_y = y.mean()
+    dx = x - mean_x
+    dy = y - mean_y
+    sxx = float(dx @ dx)
+    sxy = float(dx @ dy)
+    slope = sxy / sxx if sxx > 0.0 else 0.0
+    intercept = float(mean_y - slope * mean_x)
+    residual_ss = max(float(dy @ dy) - slope * sxy, 0.0)
+    return intercept, slope, math.sqrt(residual_ss / x.size)
+
+
+if _fit_line_compiled is not None:
+    _fit_line_impl = _fit_line_compiled
+elif njit is not None:
+    _fit_line_impl = njit(cache=True)(_fit_line_loop)
+else:
+    _fit_line_impl = _fit_line_numpy
+
+
+def fit_line(x: np.ndarray, y: np.ndarray) -> tuple[float, float, float]:
+    """Ajusta ``y = intercept + slope * x`` por mínimos cuadrados.
+
+    Devuelve ``(intercept, slope, std_error)``, donde ``std_error`` es la raíz del
+    error cuadrático medio de los residuos. Si ``x`` no varía, la pendiente es 0.
+    """
+
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    intercept, slope, std_error = _fit_line_impl(x, y)
+    return float(intercept), float(slope), float(std_error)
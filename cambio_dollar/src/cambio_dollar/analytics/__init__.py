@@ -105,6 +105,7 @@ class ProviderReliabilityAggregator:
                 provider=provider.name,
                 since=window_start,
                 until=window_end,
+                include_metadata=False,
             )
             attempts = len(metrics)
             captures = sum(1 for metric in metrics if metric.success)
@@ -134,6 +135,7 @@ class ProviderReliabilityAggregator:
                 provider=provider.name,
                 since=window_start,
                 until=window_end,
+                include_metadata=False,
             )
             deltas = [
                 sample.delta_vs_weighted
@@ -55,7 +55,15 @@ class DriftMonitor:
 
         return self._update(timestamp, value)
 
-    def _update(self, timestamp: datetime, value: float) -> DriftSignal:
+    def warmup(self, values: Iterable[float]) -> None:
+        """Avanza el estado con valores históricos sin construir señales."""
+
+        for value in values:
+            self._step(value)
+
+    def _step(self, value: float) -> tuple[float, float, str | None, float] | None:
+        """Transición de estado; ``None`` cuando el valor inicializa el EWMA."""
+
         lambda_ = self.settings.drift_ewma_lambda
         threshold = self.settings.drift_cusum_threshold
         drift_cooldown = max(self.settings.drift_cooldown_captures, 0)
@@ -67,37 +75,22 @@ class DriftMonitor:
             self._ewma = value
             self._cusum_pos = 0.0
             self._cusum_neg = 0.0
-            return DriftSignal(
-                timestamp=timestamp,
-                ewma=value,
-                cusum_pos=0.0,
-                cusum_neg=0.0,
-                threshold=threshold,
-                drift_detected=False,
-                details={"cooldown_remaining": self._cooldown_remaining},
-            )
+            return None
 
-        prev_ewma = self._ewma
-        ewma = lambda_ * value + (1 - lambda_) * prev_ewma
+        ewma = lambda_ * value + (1 - lambda_) * self._ewma
         diff = value - ewma
 
         self._cusum_pos = max(0.0, self._cusum_pos + diff - self.settings.drift_cusum_drift)
         self._cusum_neg = max(0.0, self._cusum_neg - diff - self.settings.drift_cusum_drift)
 
         direction: str | None = None
-        drift_detected = False
-        severity: str | None = None
-        intensity: float | None = None
-
         if self._cusum_pos > threshold and self._cooldown_remaining == 0:
-            drift_detected = True
             direction = "up"
             magnitude = self._cusum_pos
             if drift_cooldown > 0:
                 self._cooldown_remaining = drift_cooldown
                 self._cusum_pos /= 2
         elif self._cusum_neg > threshold and self._cooldown_remaining == 0:
-            drift_detected = True
             direction = "down"
             magnitude = self._cusum_neg
             if drift_cooldown > 0:
@@ -107,6 +100,26 @@ class DriftMonitor:
             magnitude = 0.0
 
         self._ewma = ewma
+        return ewma, diff, direction, magnitude
+
+    def _update(self, timestamp: datetime, value: float) -> DriftSignal:
+        threshold = self.settings.drift_cusum_threshold
+        step = self._step(value)
+        if step is None:
+            return DriftSignal(
+                timestamp=timestamp,
+                ewma=value,
+                cusum_pos=0.0,
+                cusum_neg=0.0,
+                threshold=threshold,
+                drift_detected=False,
+                details={"cooldown_remaining": self._cooldown_remaining},
+            )
+
+        ewma, diff, direction, magnitude = step
+        drift_detected = direction is not None
+        severity: str | None = None
+        intensity: float | None = None
 
         if drift_detected:
             safe_threshold = threshold if threshold > 0 else 1.0
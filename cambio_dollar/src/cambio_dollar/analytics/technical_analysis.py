@@ -411,9 +411,7 @@ class TechnicalAnalyzer:
         """Obtiene lista de nombres de proveedores disponibles."""
         try:
             # Obtener proveedores únicos del historial
-            providers = set()
-            for snapshot in self.repository.iter_snapshots(limit=1000):
-                providers.add(snapshot.source)
+            providers = {snapshot.source for snapshot in self.repository.iter_snapshots_stream(limit=1000)}
             return list(providers)
         except Exception:
             return []
@@ -31,7 +31,7 @@ console = Console()
 
 def _get_repository() -> MarketRepository:
     settings = _get_settings()
-    return MarketRepository(settings.db_path)
+    return MarketRepository(settings.db_path, timezone=settings.timezone)
 
 
 def _get_settings() -> Settings:
@@ -440,7 +440,7 @@ def provider_metrics(
     """Calcula métricas agregadas de confiabilidad por proveedor."""
 
     settings = _get_settings()
-    repository = MarketRepository(settings.db_path)
+    repository = MarketRepository(settings.db_path, timezone=settings.timezone)
     aggregator = ProviderReliabilityAggregator(repository, settings)
 
     if dry_run:
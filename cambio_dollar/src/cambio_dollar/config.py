@@ -4,11 +4,10 @@
 # This software is licensed under the MIT License.
 # See LICENSE file for more details.
 
-from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -93,6 +92,78 @@ class ProviderSettings(BaseModel):
     )
 
 
+# Catálogo por defecto de proveedores. Se mantiene como JSON para decodificarlo una
+# sola vez al importar el módulo mediante el parser nativo de pydantic-core, en lugar
+# de ejecutar la cadena de validación de cada constructor por separado. Las URLs de los
+# endpoints no pueden partirse dentro del JSON, de ahí el noqa al cierre de la cadena.
+_DEFAULT_PROVIDERS_JSON = r"""
+[
+    {
+        "name": "Banco Central RD",
+        "endpoint": "https://api.exchangerate.host/latest?base=USD&symbols=DOP",
+        "mid_path": "rates.DOP",
+        "spread_adjust": 0.20,
+        "max_retries": 1
+    },
+    {
+        "name": "Banreservas",
+        "endpoint": "https://open.er-api.com/v6/latest/USD",
+        "mid_path": "rates.DOP",
+        "spread_adjust": 0.35,
+        "max_retries": 1
+    },
+    {
+        "name": "Banco Central RD API v2",
+        "endpoint": "https://apis.bancentral.gov.do/indicadoreseconomicos/api/v1/series/3540/valores?formato=json&ultimos=1",
+        "buy_path": "results.0.valor_compra",
+        "sell_path": "results.0.valor_venta",
+        "auth_headers": {"Ocp-Apim-Subscription-Key": "BCRD_API_KEY"},
+        "timeout": 10.0,
+        "max_retries": 3,
+        "backoff_seconds": 1.0,
+        "enabled": true
+    },
+    {
+        "name": "Banco Popular",
+        "endpoint": "https://api.us-east-a.apiconnect.ibmappdomain.cloud/apiportalpopular/bpdsandbox/consultatasa/consultaTasa",
+        "buy_path": "monedas.moneda[descripcion=USD].compra",
+        "sell_path": "monedas.moneda[descripcion=USD].venta",
+        "spread_adjust": 0.10,
+        "auth_headers": {"X-IBM-Client-Id": "BPD_CLIENT_ID"},
+        "oauth_token_url": "https://api.us-east-a.apiconnect.ibmappdomain.cloud/apiportalpopular/bpdsandbox/bpd/Authentication/oauth2/token",
+        "oauth_client_id_env": "BPD_CLIENT_ID",
+        "oauth_client_secret_env": "BPD_CLIENT_SECRET",
+        "oauth_scope": "scope_1",
+        "enabled": true
+    },
+    {
+        "name": "InfoDolar",
+        "endpoint": "https://www.infodolar.com.do/",
+        "format": "html",
+        "enabled": true
+    },
+    {
+        "name": "Remesas Caribe",
+        "endpoint": "https://api.remesascache.com/v1/rates/USD/DOP",
+        "buy_path": "data.buy_rate",
+        "sell_path": "data.sell_rate",
+        "max_retries": 4,
+        "backoff_seconds": 0.75,
+        "retry_status_codes": [408, 429, 500, 502, 503, 504],
+        "retry_on_timeout": true,
+        "enabled": true
+    },
+    {"name": "Capla", "enabled": true},
+    {"name": "Cambio Extranjero", "enabled": true},
+    {"name": "Asociación Romana", "enabled": true}
+]
+"""  # noqa: E501
+
+_DEFAULT_PROVIDERS: tuple[ProviderSettings, ...] = TypeAdapter(
+    tuple[ProviderSettings, ...]
+).validate_json(_DEFAULT_PROVIDERS_JSON)
+
+
 class Settings(BaseSettings):
     """Configuración principal del asistente."""
 
@@ -114,81 +185,20 @@ class Settings(BaseSettings):
         description="Lista opcional de endpoints alternos para redundancia.",
     )
     providers: List[ProviderSettings] = Field(
-        default_factory=lambda: [
-            ProviderSettings(
-                name="Banco Central RD",
-                endpoint="https://api.exchangerate.host/latest?base=USD&symbols=DOP",
-                mid_path="rates.DOP",
-                spread_adjust=0.20,
-                max_retries=1,
-            ),
-            ProviderSettings(
-                name="Banreservas",
-                endpoint="https://open.er-api.com/v6/latest/USD",
-                mid_path="rates.DOP",
-                spread_adjust=0.35,
-                max_retries=1,
-            ),
-            ProviderSettings(
-                name="Banco Central RD API v2",
-                endpoint=(
-                    "https://apis.bancentral.gov.do/indicadoreseconomicos/api/v1/series/3540/valores"
-                    "?formato=json&ultimos=1"
-                ),
-                buy_path="results.0.valor_compra",
-                sell_path="results.0.valor_venta",
-                auth_headers={"Ocp-Apim-Subscription-Key": "BCRD_API_KEY"},
-                timeout=10.0,
-                max_retries=3,
-                backoff_seconds=1.0,
-                enabled=True,
-            ),
-            ProviderSettings(
-                name="Banco Popular",
-                endpoint=(
-                    "https://api.us-east-a.apiconnect.ibmappdomain.cloud/"
-                    "apiportalpopular/bpdsandbox/consultatasa/consultaTasa"
-                ),
-                buy_path="monedas.moneda[descripcion=USD].compra",
-                sell_path="monedas.moneda[descripcion=USD].venta",
-                spread_adjust=0.10,
-                auth_headers={"X-IBM-Client-Id": "BPD_CLIENT_ID"},
-                oauth_token_url=(
-                    "https://api.us-east-a.apiconnect.ibmappdomain.cloud/"
-                    "apiportalpopular/bpdsandbox/bpd/Authentication/oauth2/token"
-                ),
-                oauth_client_id_env="BPD_CLIENT_ID",
-                oauth_client_secret_env="BPD_CLIENT_SECRET",
-                oauth_scope="scope_1",
-                enabled=True,
-            ),
-            ProviderSettings(
-                name="InfoDolar",
-                endpoint="https://www.infodolar.com.do/",
-                format="html",
-                enabled=True,
-            ),
-            ProviderSettings(
-                name="Remesas Caribe",
-                endpoint="https://api.remesascache.com/v1/rates/USD/DOP",
-                buy_path="data.buy_rate",
-                sell_path="data.sell_rate",
-                max_retries=4,
-                backoff_seconds=0.75,
-                retry_status_codes=[408, 429, 500, 502, 503, 504],
-                retry_on_timeout=True,
-                enabled=True,
-            ),
-            ProviderSettings(name="Capla", enabled=True),
-            ProviderSettings(name="Cambio Extranjero", enabled=True),
-            ProviderSettings(name="Asociación Romana", enabled=True),
-        ],
+        default_factory=lambda: [provider.model_copy(deep=True) for provider in _DEFAULT_PROVIDERS],
         description="Configuración de proveedores dominicanos para cotizaciones.",
     )
     db_path: Path = Field(
         default=Path("./data/cambio_dollar.sqlite"),
         description="Ruta del archivo SQLite utilizado para almacenar datos.",
     )
+    oauth_token_cache_path: Optional[Path] = Field(
+        default=None,
+        description=(
+            "Archivo JSON opcional donde persistir tokens OAuth vigentes entre ejecuciones. "
+            "Si no se define, los tokens solo se conservan en memoria durante el proceso."
+        ),
+    )
     min_profit_margin: float = Field(
         default=0.5,
         description="Margen mínimo (DOP) requerido por cada USD para considerar una operación rentable.",
@@ -338,10 +348,37 @@ class Settings(BaseSettings):
         ge=30,
         description="Ventana histórica en minutos utilizada para evaluar drift.",
     )
+    drift_prime_max_records: int = Field(
+        default=10_000,
+        ge=1,
+        description="Máximo de consensos recientes usados para inicializar el monitor de drift.",
+    )
+
+
+_settings: Optional[Settings] = None
 
 
-@lru_cache
 def get_settings() -> Settings:
-    """Retorna la configuración global, cachéada para eficiencia."""
+    """Retorna la configuración global, cachéada para eficiencia.
+
+    Evita el candado interno de ``lru_cache``: leer el global es atómico y, en el
+    peor caso, dos hilos construyen ``Settings`` a la vez y uno descarta el suyo.
+    """
+
+    global _settings
+
+    settings = _settings
+    if settings is None:
+        settings = Settings()
+        _settings = settings
+    return settings
+
+
+def _clear_settings_cache() -> None:
+    global _settings
+
+    _settings = None
+
 
-    return Settings()
+# Mantiene la API de ``lru_cache`` usada por pruebas y herramientas.
+get_settings.cache_clear = _clear_settings_cache  # type: ignore[attr-defined]
@@ -6,16 +6,28 @@
 
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import json
 import logging
 import os
+import random
 import re
-import statistics
+import sys
+import threading
 import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Iterable, List, Optional
+from functools import lru_cache
+from itertools import accumulate
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Callable, ClassVar, Coroutine, Iterable, List, NamedTuple, Optional, TypeVar
 
 import httpx
+import numpy as np
 from selectolax.parser import HTMLParser, Node
 from zoneinfo import ZoneInfo
 
@@ -23,87 +35,257 @@ from .analytics import ProviderWeightCalculator, ZScoreAnomalyDetector
 from .analytics.drift import DriftMonitor
 from .config import ProviderSettings, Settings, get_settings
 from .models import (
+    AnomalyEvent,
     ConsensusSnapshot,
     ConsensusSnapshotRecord,
     DriftDirection,
     DriftEvent,
     DriftSeverity,
     ProviderErrorSample,
+    PROVIDER_VALIDATION_LIST,
     ProviderFetchMetric,
-    ProviderValidation,
     RateSnapshot,
 )
+from .repository import MarketRepository
 
 logger = logging.getLogger(__name__)
 
+_T = TypeVar("_T")
+
+
+try:  # orjson es opcional (extra ``speedups``); acelera la decodificación de payloads.
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None  # type: ignore[assignment]
+
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_CONNECT_TIMEOUT_SECONDS = 5.0
+_MAX_BACKOFF_SHIFT = 10
+_POOL_LIMITS = httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60)
+
+
+def _decode_json(content: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _html_payload(response: httpx.Response) -> str | bytes:
+    """Entrega el HTML sin decodificar cuando es UTF-8 (o no declara charset).
+
+    selectolax decodifica UTF-8 en C; otros charsets declarados pasan por httpx.
+    """
+
+    charset = response.charset_encoding
+    if charset is None or charset.lower().replace("_", "-") in {"utf-8", "utf8"}:
+        return response.content
+    return response.text
+
+
+def _build_async_client() -> httpx.AsyncClient:
+    """Crea el cliente HTTP compartido con keep-alive y HTTP/2 cuando está disponible."""
+
+    transport = httpx.AsyncHTTPTransport(
+        http2=_HTTP2_AVAILABLE,
+        limits=_POOL_LIMITS,
+        retries=0,
+    )
+    return httpx.AsyncClient(transport=transport)
+
+
+def _request_timeout(provider: ProviderSettings) -> httpx.Timeout:
+    return httpx.Timeout(
+        provider.timeout,
+        connect=min(_CONNECT_TIMEOUT_SECONDS, provider.timeout),
+    )
+
 
 _SELECTOR_PATTERN = re.compile(r"^(?P<key>[^\[]+)?(?:\[(?P<selector>[^\]]*)\])?$")
 
 
-def _extract_from_path(data: dict[str, Any], path: Optional[str]) -> Optional[float]:
-    if path is None:
-        return None
-    current: Any = data
-    for part in path.split("."):
-        if isinstance(current, dict):
-            match = _SELECTOR_PATTERN.match(part)
-            if not match:
-                return None
-            key = match.group("key") or ""
-            selector = match.group("selector")
-            if key:
-                current = current.get(key)
-            if selector:
-                current = _apply_selector(current, selector)
-        elif isinstance(current, list):
-            current = _select_from_sequence(current, part)
-        else:
-            return None
-    if isinstance(current, (int, float)):
-        return float(current)
-    if isinstance(current, str):
+# Estados del escáner de precios (_parse_price)
+_PRICE_SCAN, _PRICE_INTEGER, _PRICE_SEPARATOR, _PRICE_FRACTION = range(4)
+# Modest devuelve las coincidencias agrupadas por selector, en el orden de la lista:
+# las tablas etiquetadas tienen prioridad sobre la primera tabla genérica.
+_RATE_TABLE_SELECTOR = "table#Dolar, table#dolar, table[data-name='Dolar'], table[data-name='dolar'], table"
+
+
+class _Selector(NamedTuple):
+    """Selector entre corchetes (``[0]``, ``[codigo=USD]``) resuelto de antemano."""
+
+    raw: str
+    index: Optional[int]
+    field: str
+    value: str
+
+
+def _parse_index(token: str) -> Optional[int]:
+    token = token.strip()
+    if token.isdigit() or (token.startswith("-") and token[1:].isdigit()):
         try:
-            return float(current)
+            return int(token)
         except ValueError:
             return None
     return None
 
 
-def _apply_selector(current: Any, selector: str) -> Any:
+def _compile_selector(raw: str) -> _Selector:
+    stripped = raw.strip()
+    field, _, value = stripped.partition("=")
+    return _Selector(raw=raw, index=_parse_index(stripped), field=field.strip(), value=value.strip())
+
+
+def _compile_step(part: str) -> Callable[[Any], Any]:
+    """Especializa un segmento de ruta en una función ``nodo -> nodo`` (None si falta).
+
+    Sobre un dict se usan la clave y el selector del segmento; sobre una lista, el
+    segmento completo como índice.
+    """
+
+    index = _parse_index(part)
+    match = _SELECTOR_PATTERN.match(part)
+    if match is None:
+
+        def invalid_step(node: Any) -> Any:
+            return _item_at(node, index) if isinstance(node, list) else None
+
+        return invalid_step
+
+    key = match.group("key") or ""
+    raw_selector = match.group("selector")
+    selector = _compile_selector(raw_selector) if raw_selector else None
+    if selector is None:
+
+        def key_step(node: Any) -> Any:
+            if isinstance(node, dict):
+                return node.get(key) if key else node
+            if isinstance(node, list):
+                return _item_at(node, index)
+            return None
+
+        return key_step
+
+    def selector_step(node: Any) -> Any:
+        if isinstance(node, dict):
+            return _apply_selector(node.get(key) if key else node, selector)
+        if isinstance(node, list):
+            return _item_at(node, index)
+        return None
+
+    return selector_step
+
+
+@lru_cache(maxsize=256)
+def _compile_accessor(path: str) -> Callable[[Any], Optional[float]]:
+    """Compila ``path`` una sola vez en una cadena de pasos especializados."""
+
+    steps = tuple(_compile_step(part) for part in path.split("."))
+
+    def accessor(data: Any) -> Optional[float]:
+        current = data
+        for step in steps:
+            current = step(current)
+            if current is None:
+                return None
+        if isinstance(current, (int, float)):
+            return float(current)
+        if isinstance(current, str):
+            try:
+                return float(current)
+            except ValueError:
+                return None
+        return None
+
+    return accessor
+
+
+def _extract_from_path(data: dict[str, Any], path: Optional[str]) -> Optional[float]:
+    if path is None:
+        return None
+    return _compile_accessor(path)(data)
+
+
+def _apply_selector(current: Any, selector: _Selector) -> Any:
     if current is None:
         return None
     if isinstance(current, list):
-        selector = selector.strip()
-        if selector.isdigit() or (selector.startswith("-") and selector[1:].isdigit()):
-            index = int(selector)
-            if index < 0:
-                index += len(current)
-            if 0 <= index < len(current):
-                return current[index]
-            return None
-        key, _, value = selector.partition("=")
-        key = key.strip()
-        value = value.strip()
+        if selector.index is not None:
+            return _item_at(current, selector.index)
         for item in current:
-            if isinstance(item, dict) and str(item.get(key)) == value:
+            if isinstance(item, dict) and str(item.get(selector.field)) == selector.value:
                 return item
         return None
     if isinstance(current, dict):
-        return current.get(selector)
+        return current.get(selector.raw)
     return None
 
 
-def _select_from_sequence(sequence: list[Any], token: str) -> Any:
-    token = token.strip()
-    if token.isdigit() or (token.startswith("-") and token[1:].isdigit()):
-        index = int(token)
-        if index < 0:
-            index += len(sequence)
-        if 0 <= index < len(sequence):
-            return sequence[index]
+def _item_at(sequence: list[Any], index: Optional[int]) -> Any:
+    if index is None:
+        return None
+    if index < 0:
+        index += len(sequence)
+    if 0 <= index < len(sequence):
+        return sequence[index]
     return None
 
 
+_SMALL_MEDIAN_SIZE = 32
+
+
+def _fast_median(values: List[float]) -> float:
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) * 0.5
+
+
+def _median(values: np.ndarray) -> float:
+    # Con pocos proveedores ordenar en Python supera el costo fijo de np.median.
+    if values.size <= _SMALL_MEDIAN_SIZE:
+        return _fast_median(values.tolist())
+    return float(np.median(values))
+
+
+def _load_oauth_tokens(path: Path, now: float) -> dict[tuple[Any, ...], tuple[str, float]]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.warning("Caché OAuth ilegible en %s: %s", path, exc)
+        return {}
+    tokens: dict[tuple[Any, ...], tuple[str, float]] = {}
+    for entry in raw if isinstance(raw, list) else []:
+        try:
+            key = tuple(entry["key"])
+            token = str(entry["token"])
+            expires_at = float(entry["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if expires_at > now:
+            tokens[key] = (token, expires_at)
+    return tokens
+
+
+def _dump_oauth_tokens(
+    path: Path,
+    tokens: dict[Any, tuple[str, float]],
+    now: float,
+) -> None:
+    entries = [
+        {"key": list(key), "token": token, "expires_at": expires_at}
+        for key, (token, expires_at) in tokens.items()
+        if expires_at > now
+    ]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # El archivo contiene credenciales: solo el propietario puede leerlo.
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(entries, handle)
+
+
 def _safe_metadata(metadata: Optional[dict[str, Any]]) -> dict[str, Any]:
     if metadata is None:
         return {}
@@ -125,66 +307,144 @@ class ProviderFetchResult:
         return self.snapshots[0]
 
 
+_OAuthCacheKey = tuple[str, Optional[str], Optional[str], Optional[str]]
+_OAUTH_EXPIRY_SKEW_SECONDS = 30.0
+
+
 class ExchangeRateClient:
-    def __init__(self, settings: Settings, http_client: Optional[httpx.Client] = None) -> None:
+    # Compartido entre instancias: MarketDataService crea un cliente por captura.
+    _OAUTH_CACHE: ClassVar[dict[_OAuthCacheKey, tuple[str, float]]] = {}
+    _OAUTH_LOCK: ClassVar[threading.Lock] = threading.Lock()
+    _OAUTH_LOADED_PATHS: ClassVar[set[Path]] = set()
+
+    def __init__(
+        self,
+        settings: Settings,
+        http_client: Optional[httpx.Client] = None,
+        *,
+        async_client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
         self.settings = settings
         self._timezone = ZoneInfo(settings.timezone)
-        self._client = http_client or httpx.Client()
-        self._owns_client = http_client is None
-        self._oauth_cache: dict[tuple[str, Optional[str], Optional[str]], tuple[str, float]] = {}
+        self._client = http_client
+        self._async_client = async_client
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pooled_client: Optional[httpx.AsyncClient] = None
+        self._pooled_client_loop: Optional[asyncio.AbstractEventLoop] = None
         self._last_metrics: list[ProviderFetchMetric] = []
 
     def fetch_all(self) -> list[ProviderFetchResult]:
+        """Captura todos los proveedores habilitados de forma concurrente.
+
+        Envoltorio síncrono de :meth:`fetch_all_async`; desde código que ya corre
+        dentro de un event loop debe usarse directamente la variante asíncrona.
+        El event loop se conserva entre llamadas para reutilizar las conexiones
+        abiertas del pool HTTP.
+        """
+
+        return self.run_sync(self.fetch_all_async())
+
+    def run_sync(self, coroutine: Coroutine[Any, Any, _T]) -> _T:
+        """Ejecuta ``coroutine`` en el event loop privado del cliente."""
+
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coroutine)
+
+    async def fetch_all_async(self) -> list[ProviderFetchResult]:
+        providers = [provider for provider in self.settings.providers if provider.enabled]
+        client = self._async_client or self._client or self._shared_client()
+        outcomes = await self._gather_providers(providers, client)
+
         results: list[ProviderFetchResult] = []
         metrics: list[ProviderFetchMetric] = []
-
-        for provider in self.settings.providers:
-            if not provider.enabled:
+        for provider, outcome in zip(providers, outcomes):
+            if isinstance(outcome, BaseException):  # pragma: no cover - defensivo
+                logger.warning("Proveedor %s falló: %s", provider.name, outcome)
                 continue
-
-            metric = ProviderFetchMetric(
-                timestamp=datetime.now(tz=self._timezone),
-                provider=provider.name,
-                latency_ms=None,
-                status_code=None,
-                success=False,
-                attempts=1,
-                retries=0,
-                error=None,
-                metadata={
-                    "method": provider.method,
-                    "timeout": provider.timeout,
-                    "format": provider.format,
-                },
-            )
-            capture_start = time.perf_counter()
-            try:
-                result = self._fetch_provider(provider, metric)
+            result, metric = outcome
+            metrics.append(metric)
+            if result is not None:
                 results.append(result)
-            except Exception as exc:  # noqa: BLE001 - se registra y se continúa
-                metric.error = str(exc)
-                logger.warning("Proveedor %s falló: %s", provider.name, exc)
-            finally:
-                if metric.latency_ms is None:
-                    metric.latency_ms = (time.perf_counter() - capture_start) * 1000
-                metric.timestamp = datetime.now(tz=self._timezone)
-                metrics.append(metric)
 
+        self._last_metrics = metrics
         if not results:
-            self._last_metrics = metrics
             raise RuntimeError("No se pudo obtener información de ningún proveedor.")
-
-        self._last_metrics = metrics
         return results
 
+    async def _gather_providers(
+        self,
+        providers: list[ProviderSettings],
+        client: httpx.Client | httpx.AsyncClient,
+    ) -> list[tuple[Optional[ProviderFetchResult], ProviderFetchMetric] | BaseException]:
+        # return_exceptions evita que el fallo de un proveedor cancele al resto.
+        return await asyncio.gather(
+            *(self._capture_provider(provider, client) for provider in providers),
+            return_exceptions=True,
+        )
+
+    async def _capture_provider(
+        self,
+        provider: ProviderSettings,
+        client: httpx.Client | httpx.AsyncClient,
+    ) -> tuple[Optional[ProviderFetchResult], ProviderFetchMetric]:
+        metric = ProviderFetchMetric(
+            timestamp=datetime.now(tz=self._timezone),
+            provider=provider.name,
+            latency_ms=None,
+            status_code=None,
+            success=False,
+            attempts=1,
+            retries=0,
+            error=None,
+            metadata={
+                "method": provider.method,
+                "timeout": provider.timeout,
+                "format": provider.format,
+            },
+        )
+        result: Optional[ProviderFetchResult] = None
+        capture_start = time.perf_counter()
+        try:
+            result = await self._fetch_provider(provider, metric, client)
+        except Exception as exc:  # noqa: BLE001 - se registra y se continúa
+            metric.error = str(exc)
+            logger.warning("Proveedor %s falló: %s", provider.name, exc)
+        finally:
+            if metric.latency_ms is None:
+                metric.latency_ms = (time.perf_counter() - capture_start) * 1000
+            metric.timestamp = datetime.now(tz=self._timezone)
+        return result, metric
+
+    def _shared_client(self) -> httpx.AsyncClient:
+        # Las conexiones del pool quedan ligadas al loop donde se abrieron.
+        loop = asyncio.get_running_loop()
+        if self._pooled_client is None or self._pooled_client_loop is not loop:
+            self._pooled_client = _build_async_client()
+            self._pooled_client_loop = loop
+        return self._pooled_client
+
     def consume_metrics(self) -> list[ProviderFetchMetric]:
         metrics, self._last_metrics = self._last_metrics, []
         return metrics
 
-    def _fetch_provider(
+    @staticmethod
+    async def _send(
+        client: httpx.Client | httpx.AsyncClient,
+        method: str,
+        url: str,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        if isinstance(client, httpx.AsyncClient):
+            return await client.request(method, url, **kwargs)
+        # Un cliente síncrono inyectado es thread-safe; se delega a un hilo.
+        return await asyncio.to_thread(client.request, method, url, **kwargs)
+
+    async def _fetch_provider(
         self,
         provider: ProviderSettings,
         metric: ProviderFetchMetric,
+        client: httpx.Client | httpx.AsyncClient,
     ) -> ProviderFetchResult:
         if not provider.endpoint:
             metric.error = "Endpoint no configurado"
@@ -195,7 +455,7 @@ class ExchangeRateClient:
         for header_name, env_var in provider.auth_headers.items():
             headers[header_name] = self._require_env(env_var, f"header {header_name}")
         if provider.oauth_token_url:
-            token = self._get_oauth_token(provider)
+            token = await self._get_oauth_token(provider, client)
             headers["Authorization"] = f"Bearer {token}"
         if provider.auth_header and provider.auth_token_env:
             headers.setdefault(
@@ -212,11 +472,12 @@ class ExchangeRateClient:
             metric.attempts += 1
             attempt_start = time.perf_counter()
             try:
-                response = self._client.request(
+                response = await self._send(
+                    client,
                     provider.method,
                     provider.endpoint,
                     headers=headers or None,
-                    timeout=provider.timeout,
+                    timeout=_request_timeout(provider),
                 )
                 metric.latency_ms = (time.perf_counter() - attempt_start) * 1000
                 metric.status_code = response.status_code
@@ -232,7 +493,7 @@ class ExchangeRateClient:
                     exc,
                 )
                 metric.retries += 1
-                self._sleep_backoff(provider, attempt)
+                await self._sleep_backoff(provider, attempt)
                 continue
 
             if response.status_code in provider.retry_status_codes and attempt < provider.max_retries:
@@ -245,7 +506,7 @@ class ExchangeRateClient:
                     provider.name,
                     response.status_code,
                 )
-                self._sleep_backoff(provider, attempt)
+                await self._sleep_backoff(provider, attempt)
                 continue
 
             try:
@@ -269,10 +530,10 @@ class ExchangeRateClient:
             raise RuntimeError(f"No se obtuvo respuesta de {provider.name}")
 
         if provider.format == "html":
-            payload = response.text
+            payload = _html_payload(response)
             snapshots = self._parse_html_table(provider, payload)
         else:
-            payload = response.json()
+            payload = _decode_json(response.content)
             snapshots = self._parse_payload(provider, payload)
 
         metadata = _safe_metadata(metric.metadata)
@@ -309,21 +570,28 @@ class ExchangeRateClient:
             )
         ]
 
-    def _parse_html_table(self, provider: ProviderSettings, html_content: str) -> list[RateSnapshot]:
-        logger.debug("HTML content: %s", html_content)
+    def _parse_html_table(
+        self, provider: ProviderSettings, html_content: str | bytes
+    ) -> list[RateSnapshot]:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("HTML content: %s", html_content)
         parser = HTMLParser(html_content)
         table = self._locate_rate_table(parser)
         if table is None:
             logger.warning("No se encontró tabla de tasas para %s", provider.name)
             return []
 
+        # Todas las filas de una misma captura comparten el instante de lectura.
+        captured_at = datetime.now(tz=self._timezone)
         snapshots: list[RateSnapshot] = []
         for row in table.css("tr"):
-            cells = row.css("td")
+            # Las celdas son hijos directos de la fila; evita compilar un selector por fila.
+            cells = [child for child in row.iter() if child.tag == "td"]
             if len(cells) < 3:
                 continue
 
-            bank_name = cells[0].text(separator=" ", strip=True).strip()
+            # Internado: cada captura repite los mismos nombres de banco.
+            bank_name = sys.intern(cells[0].text(separator=" ", strip=True).strip())
             buy_text = cells[1].text(separator=" ", strip=True).strip()
             sell_text = cells[2].text(separator=" ", strip=True).strip()
 
@@ -335,7 +603,7 @@ class ExchangeRateClient:
 
             snapshots.append(
                 RateSnapshot(
-                    timestamp=datetime.now(tz=self._timezone),
+                    timestamp=captured_at,
                     buy_rate=buy_rate,
                     sell_rate=sell_rate,
                     source=bank_name,
@@ -346,37 +614,56 @@ class ExchangeRateClient:
         return snapshots
 
     def _locate_rate_table(self, parser: HTMLParser) -> Optional[Node]:
-        candidates = ["table#Dolar", "table#dolar", "table[data-name='Dolar']", "table[data-name='dolar']"]
-        for selector in candidates:
-            node = parser.css_first(selector)
-            if node is not None:
-                return node
-        return parser.css_first("table")
+        return parser.css_first(_RATE_TABLE_SELECTOR)
 
     @staticmethod
     def _parse_price(raw_text: str) -> Optional[float]:
-        if not raw_text:
-            return None
-        # Eliminar símbolos de moneda
-        cleaned = raw_text.replace("RD$", "").replace("US$", "").replace("$", "")
-        # Extraer solo el primer número antes de cualquier símbolo '=' o variación
-        # Ej: "$62.90 = $0.00" -> "62.90", "$63.10 $0.10" -> "63.10"
-        if "=" in cleaned:
-            cleaned = cleaned.split("=")[0].strip()
-        # Buscar el primer número válido con regex
-        match = re.search(r'(\d+[.,]\d+|\d+)', cleaned)
-        if not match:
-            return None
-        cleaned = match.group(1)
-        # Manejar formato con coma como decimal (ej: "62,90")
-        if "," in cleaned and "." not in cleaned:
-            cleaned = cleaned.replace(",", ".")
-        # Eliminar comas como separadores de miles
-        cleaned = cleaned.replace(",", "")
-        try:
-            return float(cleaned)
-        except ValueError:
+        """Extrae el primer número de una celda en una sola pasada.
+
+        Omite los símbolos de moneda (``RD$``, ``US$``, ``$``), se detiene en el
+        primer ``=`` (ej: "$62.90 = $0.00" -> 62.9) y admite un único separador
+        decimal, punto o coma (ej: "62,90" -> 62.9).
+        """
+        length = len(raw_text)
+        mantissa = 0
+        scale = 0
+        state = _PRICE_SCAN
+        index = 0
+        while index < length:
+            char = raw_text[index]
+            if char == "$":
+                index += 1
+                continue
+            if (char == "R" and raw_text.startswith("D$", index + 1)) or (
+                char == "U" and raw_text.startswith("S$", index + 1)
+            ):
+                index += 3
+                continue
+            if char == "=":
+                break
+            if "0" <= char <= "9":
+                digit = ord(char) - 48
+            elif char.isdecimal():
+                digit = int(char)
+            else:
+                digit = -1
+            if digit >= 0:
+                mantissa = mantissa * 10 + digit
+                if state == _PRICE_SCAN or state == _PRICE_INTEGER:
+                    state = _PRICE_INTEGER
+                else:
+                    state = _PRICE_FRACTION
+                    scale += 1
+            elif state == _PRICE_INTEGER and (char == "." or char == ","):
+                state = _PRICE_SEPARATOR
+            elif state != _PRICE_SCAN:
+                # Un separador sin dígitos posteriores deja solo la parte entera.
+                break
+            index += 1
+        if state == _PRICE_SCAN:
             return None
+        # La división entre enteros redondea igual que float("62.90").
+        return mantissa / 10 ** scale if scale else float(mantissa)
 
     def _require_env(self, var_name: Optional[str], description: str) -> str:
         if not var_name:
@@ -388,20 +675,23 @@ class ExchangeRateClient:
             )
         return value
 
-    def _get_oauth_token(self, provider: ProviderSettings) -> str:
+    async def _get_oauth_token(
+        self,
+        provider: ProviderSettings,
+        client: httpx.Client | httpx.AsyncClient,
+    ) -> str:
         if not provider.oauth_token_url:
             raise RuntimeError("El proveedor no tiene configurado un endpoint OAuth.")
-        cache_key = (
+        cache_key: _OAuthCacheKey = (
             provider.oauth_token_url,
             provider.oauth_scope,
             provider.oauth_client_id_env,
+            provider.oauth_client_secret_env,
         )
         now = time.time()
-        cached = self._oauth_cache.get(cache_key)
-        if cached:
-            token, expires_at = cached
-            if expires_at - now > 30:
-                return token
+        cached = self._cached_oauth_token(cache_key, now)
+        if cached is not None:
+            return cached
 
         client_id = self._require_env(provider.oauth_client_id_env, "OAuth client_id")
         client_secret = self._require_env(provider.oauth_client_secret_env, "OAuth client_secret")
@@ -411,23 +701,48 @@ class ExchangeRateClient:
         if provider.oauth_audience:
             data["audience"] = provider.oauth_audience
 
-        response = self._client.post(
+        response = await self._send(
+            client,
+            "POST",
             provider.oauth_token_url,
             data=data,
             auth=(client_id, client_secret),
             headers={"Content-Type": "application/x-www-form-urlencoded"},
-            timeout=provider.timeout,
+            timeout=_request_timeout(provider),
         )
         response.raise_for_status()
-        payload = response.json()
+        payload = _decode_json(response.content)
         token = payload.get("access_token")
         if not token:
             raise RuntimeError("El endpoint OAuth no devolvió un access_token válido.")
         expires_in = float(payload.get("expires_in", 300))
-        expires_at = now + max(expires_in - 30, 0)
-        self._oauth_cache[cache_key] = (token, expires_at)
+        expires_at = now + max(expires_in - _OAUTH_EXPIRY_SKEW_SECONDS, 0)
+        self._store_oauth_token(cache_key, token, expires_at)
         return token
 
+    def _cached_oauth_token(self, cache_key: _OAuthCacheKey, now: float) -> Optional[str]:
+        cache_path = self.settings.oauth_token_cache_path
+        with self._OAUTH_LOCK:
+            if cache_path is not None and cache_path not in self._OAUTH_LOADED_PATHS:
+                self._OAUTH_LOADED_PATHS.add(cache_path)
+                self._OAUTH_CACHE.update(_load_oauth_tokens(cache_path, now))
+            cached = self._OAUTH_CACHE.get(cache_key)
+        if cached is None:
+            return None
+        token, expires_at = cached
+        return token if expires_at > now else None
+
+    def _store_oauth_token(self, cache_key: _OAuthCacheKey, token: str, expires_at: float) -> None:
+        cache_path = self.settings.oauth_token_cache_path
+        with self._OAUTH_LOCK:
+            self._OAUTH_CACHE[cache_key] = (token, expires_at)
+            if cache_path is None:
+                return
+            try:
+                _dump_oauth_tokens(cache_path, self._OAUTH_CACHE, time.time())
+            except OSError as exc:
+                logger.warning("No se pudo persistir la caché OAuth en %s: %s", cache_path, exc)
+
     def _extract_timestamp(self, payload: dict[str, Any]) -> datetime:
         if "timestamp" in payload:
             try:
@@ -453,54 +768,57 @@ class ExchangeRateClient:
         if not snapshots_list:
             raise ValueError("Se requieren snapshots para generar consenso.")
 
-        buy_values = [snap.buy_rate for snap in snapshots_list]
-        sell_values = [snap.sell_rate for snap in snapshots_list]
-        consensus_buy = statistics.median(buy_values)
-        consensus_sell = statistics.median(sell_values)
+        count = len(snapshots_list)
+        buys = np.fromiter((snap.buy_rate for snap in snapshots_list), dtype=np.float64, count=count)
+        sells = np.fromiter((snap.sell_rate for snap in snapshots_list), dtype=np.float64, count=count)
+        mids = (buys + sells) / 2
+        consensus_buy = _median(buys)
+        consensus_sell = _median(sells)
         consensus_mid = (consensus_buy + consensus_sell) / 2
 
         weights = self._resolve_weights(snapshots_list, provider_weights)
-        weighted_buy = self._weighted_median(
-            [snap.buy_rate for snap in snapshots_list], weights, snapshots_list
-        )
-        weighted_sell = self._weighted_median(
-            [snap.sell_rate for snap in snapshots_list], weights, snapshots_list
-        )
-
-        mid_by_provider: dict[str, list[float]] = {}
-        for snap in snapshots_list:
-            mid_by_provider.setdefault(snap.source, []).append(snap.mid_rate)
+        weighted_buy = self._weighted_median(buys, weights, snapshots_list)
+        weighted_sell = self._weighted_median(sells, weights, snapshots_list)
+
+        # Acumula (suma, cantidad) de mids por proveedor en una sola pasada.
+        mid_totals: defaultdict[str, list[float]] = defaultdict(lambda: [0.0, 0])
+        for snap, mid in zip(snapshots_list, mids.tolist()):
+            entry = mid_totals[snap.source]
+            entry[0] += mid
+            entry[1] += 1
         weighted_mid = 0.0
-        for provider, mids in mid_by_provider.items():
+        for provider, (mid_sum, mid_count) in mid_totals.items():
             provider_weight = weights.get(provider, 0.0)
             if provider_weight <= 0:
                 continue
-            weighted_mid += statistics.mean(mids) * provider_weight
-
-        min_mid = min((snap.mid_rate for snap in snapshots_list), default=consensus_mid)
-        max_mid = max((snap.mid_rate for snap in snapshots_list), default=consensus_mid)
-
-        validations: List[ProviderValidation] = []
-        for snap in snapshots_list:
-            provider_mid = snap.mid_rate
-            delta_unweighted = provider_mid - consensus_mid
-            delta_weighted = provider_mid - weighted_mid
-            difference_unweighted = abs(delta_unweighted)
-            difference_weighted = abs(delta_weighted)
-            flagged = difference_weighted >= self.settings.divergence_threshold
-            validations.append(
-                ProviderValidation(
-                    provider=snap.source,
-                    buy_rate=snap.buy_rate,
-                    sell_rate=snap.sell_rate,
-                    difference_vs_consensus=difference_unweighted,
-                    flagged=flagged,
-                    difference_vs_weighted=difference_weighted,
-                    weight=weights.get(snap.source),
-                    delta_vs_consensus=delta_unweighted,
-                    delta_vs_weighted=delta_weighted,
+            weighted_mid += mid_sum / mid_count * provider_weight
+
+        deltas_unweighted = mids - consensus_mid
+        deltas_weighted = mids - weighted_mid
+        flagged = np.abs(deltas_weighted) >= self.settings.divergence_threshold
+
+        # Todas las validaciones se validan en un solo lote de pydantic-core.
+        validations = PROVIDER_VALIDATION_LIST.validate_python(
+            [
+                {
+                    "provider": snap.source,
+                    "buy_rate": snap.buy_rate,
+                    "sell_rate": snap.sell_rate,
+                    "difference_vs_consensus": abs(delta_unweighted),
+                    "flagged": is_flagged,
+                    "difference_vs_weighted": abs(delta_weighted),
+                    "weight": weights.get(snap.source),
+                    "delta_vs_consensus": delta_unweighted,
+                    "delta_vs_weighted": delta_weighted,
+                }
+                for snap, delta_unweighted, delta_weighted, is_flagged in zip(
+                    snapshots_list,
+                    deltas_unweighted.tolist(),
+                    deltas_weighted.tolist(),
+                    flagged.tolist(),
                 )
-            )
+            ]
+        )
 
         return ConsensusSnapshot(
             timestamp=max(snapshots_list, key=lambda s: s.timestamp).timestamp,
@@ -512,43 +830,44 @@ class ExchangeRateClient:
             weighted_mid_rate=weighted_mid,
             providers_considered=[snap.source for snap in snapshots_list],
             validations=validations,
-            divergence_range=max_mid - min_mid,
+            divergence_range=float(mids.max() - mids.min()),
             provider_weights=weights,
             anomalies=[],
         )
 
     @staticmethod
     def _weighted_median(
-        values: List[float],
+        values: np.ndarray | List[float],
         weights: dict[str, float],
         snapshots: List[RateSnapshot],
     ) -> float:
-        if not values:
+        array = np.asarray(values, dtype=np.float64)
+        if array.size == 0:
             raise ValueError("Se requieren valores para calcular la mediana ponderada.")
 
         total_weight = sum(weights.values())
         if total_weight <= 0:
-            return statistics.median(values)
+            return _median(array)
 
-        occurrences: dict[str, int] = {}
-        for snapshot in snapshots:
-            occurrences[snapshot.source] = occurrences.get(snapshot.source, 0) + 1
-
-        ordered_pairs: list[tuple[float, float]] = []
-        for value, snapshot in zip(values, snapshots):
-            provider = snapshot.source
-            provider_weight = max(weights.get(provider, 0.0), 0.0)
-            count = max(occurrences.get(provider, 1), 1)
-            normalized = (provider_weight / total_weight) / count
-            ordered_pairs.append((value, normalized))
-        ordered_pairs.sort(key=lambda item: item[0])
-
-        cumulative = 0.0
-        for value, weight in ordered_pairs:
-            cumulative += weight
-            if cumulative >= 0.5:
-                return value
-        return ordered_pairs[-1][0]
+        sources = [snapshot.source for snapshot in snapshots]
+        occurrences = Counter(sources)
+        normalized = [
+            (max(weights.get(source, 0.0), 0.0) / total_weight) / max(occurrences[source], 1)
+            for source in sources
+        ]
+        if array.size <= _SMALL_MEDIAN_SIZE:
+            # Con pocos proveedores, sort + accumulate + bisect evitan el costo fijo de NumPy.
+            ordered = sorted(zip(array.tolist(), normalized), key=itemgetter(0))
+            cumulative = list(accumulate(weight for _, weight in ordered))
+            position = min(bisect_left(cumulative, 0.5), len(ordered) - 1)
+            return ordered[position][0]
+
+        order = np.argsort(array, kind="stable")
+        cumulative_array = np.cumsum(np.asarray(normalized, dtype=np.float64)[order])
+        position = int(np.searchsorted(cumulative_array, 0.5, side="left"))
+        if position >= order.size:
+            position = order.size - 1
+        return float(array[order[position]])
 
     @staticmethod
     def _resolve_weights(
@@ -576,16 +895,25 @@ class ExchangeRateClient:
         return {provider: weight / total for provider, weight in weights.items()}
 
     @staticmethod
-    def _sleep_backoff(provider: ProviderSettings, attempt: int) -> None:
+    async def _sleep_backoff(provider: ProviderSettings, attempt: int) -> None:
         backoff = provider.backoff_seconds
         if backoff <= 0:
             return
-        delay = backoff * (2**attempt)
-        time.sleep(min(delay, backoff * (2**10)))
+        # Desplazar el exponente acotado evita potencias grandes; el jitter (hasta un
+        # 10 % del backoff base) desincroniza reintentos simultáneos entre procesos.
+        delay = backoff * (1 << min(attempt, _MAX_BACKOFF_SHIFT))
+        await asyncio.sleep(delay + random.random() * backoff * 0.1)
 
     def close(self) -> None:
-        if getattr(self, "_owns_client", False):
-            self._client.close()
+        # Los clientes HTTP inyectados pertenecen a quien los creó.
+        pooled, self._pooled_client = self._pooled_client, None
+        pooled_loop, self._pooled_client_loop = self._pooled_client_loop, None
+        loop, self._loop = self._loop, None
+        if pooled is not None and pooled_loop is loop and loop is not None and not loop.is_closed():
+            loop.run_until_complete(pooled.aclose())
+        if loop is not None and not loop.is_closed():
+            loop.run_until_complete(loop.shutdown_default_executor())
+            loop.close()
 
     def __enter__(self) -> "ExchangeRateClient":  # pragma: no cover
         return self
@@ -597,10 +925,10 @@ class ExchangeRateClient:
 class MarketDataService:
     """Orquesta la captura multi-fuente y el almacenamiento de snapshots."""
 
-    def __init__(self, repository, settings: Optional[Settings] = None) -> None:
-        from .repository import MarketRepository  # import diferido para evitar ciclos
-
+    def __init__(self, repository: MarketRepository, settings: Optional[Settings] = None) -> None:
         self.settings = settings or get_settings()
+        self._timezone = ZoneInfo(self.settings.timezone)
+        self._drift_window = timedelta(minutes=self.settings.drift_window_minutes)
         if isinstance(repository, MarketRepository):
             self.repository = repository
         else:
@@ -619,7 +947,6 @@ class MarketDataService:
         all_snapshots: list[RateSnapshot] = []
         for result in fetch_results:
             for snapshot in result.snapshots:
-                self.repository.save_snapshot(snapshot)
                 logger.info(
                     "Snapshot guardado de %s (buy=%.4f, sell=%.4f)",
                     snapshot.source,
@@ -628,24 +955,28 @@ class MarketDataService:
                 )
                 all_snapshots.append(snapshot)
 
-        weights = self._compute_weights(all_snapshots)
-        consensus = self.client.build_consensus(all_snapshots, provider_weights=weights)
-        error_samples = self._build_error_samples(consensus)
-        if error_samples:
-            self.repository.record_provider_error_samples(error_samples)
-        anomalies = self.anomaly_detector.detect(consensus)
-        if anomalies:
-            self.repository.record_anomaly_events(anomalies)
-            logger.warning(
-                "Detectadas %d anomalías: %s",
-                len(anomalies),
-                ", ".join(f"{event.provider} ({event.severity})" for event in anomalies),
-            )
-        consensus = consensus.model_copy(update={"anomalies": anomalies})
-        drift_event = self._evaluate_drift(consensus)
-        if drift_event is not None:
-            consensus = consensus.model_copy(update={"drift": drift_event})
-        self._persist_consensus(consensus)
+        # Snapshots, muestras de error, anomalías, drift y consenso de la captura se
+        # confirman en un solo commit, en el hilo del llamador.
+        with self.repository.transaction():
+            self.repository.save_snapshots(all_snapshots)
+            weights = self._compute_weights(all_snapshots)
+            consensus = self.client.build_consensus(all_snapshots, provider_weights=weights)
+            error_samples = self._build_error_samples(consensus)
+            if error_samples:
+                self.repository.record_provider_error_samples(error_samples)
+            anomalies = self.anomaly_detector.detect(consensus)
+            if anomalies:
+                self.repository.record_anomaly_events(anomalies)
+                logger.warning(
+                    "Detectadas %d anomalías: %s",
+                    len(anomalies),
+                    ", ".join(f"{event.provider} ({event.severity})" for event in anomalies),
+                )
+            consensus = consensus.model_copy(update={"anomalies": anomalies})
+            drift_event = self._evaluate_drift(consensus)
+            if drift_event is not None:
+                consensus = consensus.model_copy(update={"drift": drift_event})
+            self._persist_consensus(consensus)
         logger.info(
             "Consenso generado con %d proveedores. Divergencia: %.4f",
             len(consensus.providers_considered),
@@ -680,9 +1011,7 @@ class MarketDataService:
         return consensus
 
     def get_recent_snapshots(self, *, minutes: int = 180) -> list[RateSnapshot]:
-        from datetime import timedelta
-
-        cutoff = datetime.now(tz=ZoneInfo(self.settings.timezone)) - timedelta(minutes=minutes)
+        cutoff = datetime.now(tz=self._timezone) - timedelta(minutes=minutes)
         return list(self.repository.iter_snapshots(since=cutoff, limit=None))
 
     def close(self) -> None:
@@ -792,20 +1121,15 @@ class MarketDataService:
         self.repository.save_consensus_snapshot(record)
 
     def _prime_drift_monitor(self) -> None:
-        try:
-            reference = datetime.now(tz=ZoneInfo(self.settings.timezone)) - timedelta(
-                minutes=self.settings.drift_window_minutes
-            )
-        except Exception:  # pragma: no cover - fallback por configuración inválida
-            reference = None
+        reference = datetime.now(tz=self._timezone) - self._drift_window
 
-        records = self.repository.list_consensus_snapshots(
+        records = self.repository.iter_consensus_snapshots(
             since=reference,
-            desc=False,
+            latest=self.settings.drift_prime_max_records,
+        )
+        # Evita registrar eventos históricos nuevamente; solo calienta el estado interno
+        self.drift_monitor.warmup(
+            value
+            for value in (record.weighted_mid_rate or record.mid_rate for record in records)
+            if value is not None
         )
-        for record in records:
-            value = record.weighted_mid_rate or record.mid_rate
-            if value is None:
-                continue
-            # Evita registrar eventos históricos nuevamente; solo calienta el estado interno
-            _ = self.drift_monitor.update(record.timestamp, value)
@@ -9,8 +9,9 @@ from __future__ import annotations
 import argparse
 import logging
 import sqlite3
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 from alembic import command
 from alembic.config import Config
@@ -19,6 +20,19 @@ LOGGER = logging.getLogger(__name__)
 
 BASELINE_REVISION = "0001_initial_schema"
 
+_MIGRATIONS_PATH = (Path(__file__).resolve().parent / "migrations").as_posix()
+
+# WAL permite lecturas concurrentes con el escritor; con WAL, synchronous=NORMAL
+# sigue siendo seguro ante caídas del proceso y evita un fsync por transacción.
+SQLITE_PRAGMAS: tuple[str, ...] = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
 
 def _default_db_path() -> Path:
     from .config import get_settings
@@ -27,10 +41,22 @@ def _default_db_path() -> Path:
     return Path(settings.db_path)
 
 
+def configure_connection(conn: Any) -> None:
+    """Aplica los PRAGMA de rendimiento a una conexión DB-API de SQLite."""
+
+    cursor = conn.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+@lru_cache(maxsize=32)
 def _build_config(db_path: Path) -> Config:
+    # Cada MarketRepository migra al iniciarse; la configuración se reutiliza por ruta.
     cfg = Config()
-    migrations_path = Path(__file__).resolve().parent / "migrations"
-    cfg.set_main_option("script_location", str(migrations_path))
+    cfg.set_main_option("script_location", _MIGRATIONS_PATH)
     cfg.set_main_option("sqlalchemy.url", f"sqlite+pysqlite:///{db_path}")
     cfg.attributes["configure_logger"] = False
     return cfg
@@ -44,15 +70,15 @@ def upgrade_database(db_path: Optional[Path] = None) -> None:
 
     if path.exists():
         with sqlite3.connect(path) as conn:
-            has_version = conn.execute(
-                "SELECT name FROM sqlite_master WHERE type='table' AND name='alembic_version'"
+            configure_connection(conn)
+            # Una sola lectura de sqlite_master: tabla de versiones y resto de tablas.
+            has_version, other_tables = conn.execute(
+                "SELECT "
+                "COALESCE(SUM(name = 'alembic_version'), 0), "
+                "COALESCE(SUM(name NOT LIKE 'sqlite_%' AND name != 'alembic_version'), 0) "
+                "FROM sqlite_master WHERE type='table'"
             ).fetchone()
-            if not has_version:
-                existing_tables = conn.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"
-                ).fetchall()
-                if existing_tables:
-                    needs_baseline_stamp = True
+            needs_baseline_stamp = not has_version and other_tables > 0
 
     LOGGER.debug("Ejecutando migraciones Alembic en %s", path)
     if needs_baseline_stamp:
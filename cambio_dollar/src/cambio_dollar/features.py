@@ -7,12 +7,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 
 import numpy as np
-import pandas as pd
 
+from ._kernels import fit_line
 from .models import RateSnapshot
 from .repository import MarketRepository
 
@@ -39,41 +39,46 @@ class MarketFeatureBuilder:
         self.repository = repository
 
     def compute(self, *, window_minutes: int = 240) -> Optional[MarketFeatures]:
-        latest = self.repository.latest_by_provider()
-        if not latest:
+        table = self.repository.snapshot_table()
+        if not len(table):
             return None
 
-        latest_snapshots: List[RateSnapshot] = list(latest.values())
-        generated_at = max(s.timestamp for s in latest_snapshots)
+        generated_at = max(table.timestamps)
 
-        # Métricas instantáneas
-        best_buy_rate = min(s.buy_rate for s in latest_snapshots)
-        best_sell_rate = max(s.sell_rate for s in latest_snapshots)
-        avg_buy_rate = float(np.mean([s.buy_rate for s in latest_snapshots]))
-        avg_sell_rate = float(np.mean([s.sell_rate for s in latest_snapshots]))
+        # Métricas instantáneas: reducciones directas sobre las columnas del repositorio
+        best_buy_rate = float(table.buy.min())
+        best_sell_rate = float(table.sell.max())
+        avg_buy_rate = float(table.buy.mean())
+        avg_sell_rate = float(table.sell.mean())
         spread_market = avg_sell_rate - avg_buy_rate
         spread_best = best_sell_rate - best_buy_rate
-        divergence = max(s.mid_rate for s in latest_snapshots) - min(s.mid_rate for s in latest_snapshots)
+        divergence = float(table.mid.max() - table.mid.min())
 
         # Historial reciente para momentum/volatilidad
         cutoff = generated_at - timedelta(minutes=window_minutes)
-        history = self.repository.iter_snapshots(since=cutoff)
+        history = self.repository.iter_snapshots(since=cutoff, ascending=True)
         volatility = 0.0
         momentum = 0.0
         if len(history) > 1:
-            df = _snapshots_to_frame(history)
-            df = df.sort_index()
-            pct = df["mid"].pct_change().dropna()
-            if not pct.empty:
-                volatility = float(pct.std())
-            elapsed = (df.index - df.index[0]).total_seconds() / 3600.0
-            if len(df) > 1 and np.ptp(elapsed) > 0:
-                slope, _ = np.polyfit(elapsed, df["mid"].to_numpy(), 1)
-                momentum = float(slope)
+            count = len(history)
+            seconds = _relative_seconds(history)
+            mids = np.fromiter((s.mid_rate for s in history), dtype=np.float64, count=count)
+            # SQLite ordena el texto ISO; solo se reordena si hay offsets mezclados.
+            if np.any(np.diff(seconds) < 0):
+                order = np.argsort(seconds, kind="stable")
+                seconds = seconds[order]
+                mids = mids[order]
+            returns = np.diff(mids) / mids[:-1]
+            # Desviación muestral (ddof=1); con un solo retorno no hay dispersión que medir.
+            if returns.size > 1:
+                volatility = float(returns.std(ddof=1))
+            elapsed = (seconds - seconds[0]) / 3600.0
+            if np.ptp(elapsed) > 0:
+                _, momentum, _ = fit_line(elapsed, mids)
 
         return MarketFeatures(
             generated_at=generated_at,
-            provider_count=len(latest_snapshots),
+            provider_count=len(table),
             best_buy_rate=best_buy_rate,
             best_sell_rate=best_sell_rate,
             avg_buy_rate=avg_buy_rate,
@@ -86,12 +91,26 @@ class MarketFeatureBuilder:
         )
 
 
-def _snapshots_to_frame(history: Iterable[RateSnapshot]) -> pd.DataFrame:
-    data = {
-        "timestamp": [snap.timestamp for snap in history],
-        "mid": [snap.mid_rate for snap in history],
-    }
-    df = pd.DataFrame(data)
-    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
-    df.set_index("timestamp", inplace=True)
-    return df
+def _relative_seconds(history: List[RateSnapshot]) -> np.ndarray:
+    """Segundos de cada snapshot respecto al primero de ``history``.
+
+    Restar datetimes es bastante más barato que ``timestamp()`` por elemento; solo
+    si se mezclan timestamps con y sin zona se normaliza cada uno a epoch UTC.
+    """
+
+    reference = history[0].timestamp
+    try:
+        return np.fromiter(
+            ((s.timestamp - reference).total_seconds() for s in history),
+            dtype=np.float64,
+            count=len(history),
+        )
+    except TypeError:
+        return np.fromiter((_epoch_seconds(s.timestamp) for s in history), dtype=np.float64, count=len(history))
+
+
+def _epoch_seconds(timestamp: datetime) -> float:
+    # Los timestamps sin zona se interpretan como UTC.
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.timestamp()
@@ -7,12 +7,14 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, time, timedelta
+from datetime import date, datetime, time
+from functools import lru_cache
 from typing import Optional
 
 import numpy as np
 from zoneinfo import ZoneInfo
 
+from ._kernels import fit_line
 from .config import Settings, get_settings
 from .models import ForecastResult, RateSnapshot
 from .repository import MarketRepository
@@ -41,11 +43,7 @@ class ForecastService:
             )
         model = self._fit_trend_model(snapshots)
         latest = snapshots[0]
-        start_of_day = datetime.combine(
-            latest.timestamp.astimezone(self._timezone).date(),
-            time.min,
-            tzinfo=self._timezone,
-        )
+        start_of_day, _ = _day_bounds(latest.timestamp.astimezone(self._timezone).date(), self._timezone)
 
         realized_profit = self.repository.get_profit_summary(since=start_of_day)
         remaining_hours = self._hours_until_close(latest.timestamp)
@@ -53,18 +51,18 @@ class ForecastService:
         current_mid = latest.mid_rate
         projected_increment = expected_rate - current_mid
 
-        expected_unrealized = (
-            projected_increment - self.settings.transaction_cost
-        ) * self.settings.trading_units
-        best_case = expected_unrealized + model.std_error * self.settings.trading_units
-        worst_case = expected_unrealized - model.std_error * self.settings.trading_units
+        # Escenarios esperado/mejor/peor: ganancia base ± una desviación, en unidades negociadas.
+        units = self.settings.trading_units
+        unrealized = (projected_increment - self.settings.transaction_cost) * units
+        expected_profit = realized_profit + unrealized
+        deviation = model.std_error * units
 
         return ForecastResult(
             generated_at=datetime.now(tz=self._timezone),
-            expected_profit_end_day=realized_profit + expected_unrealized,
-            best_case=realized_profit + best_case,
-            worst_case=realized_profit + worst_case,
-            confidence_interval=model.std_error * 2 * self.settings.trading_units,
+            expected_profit_end_day=expected_profit,
+            best_case=expected_profit + deviation,
+            worst_case=expected_profit - deviation,
+            confidence_interval=2 * deviation,
             details=(
                 "Regresión lineal sobre las últimas "
                 f"{len(snapshots)} observaciones para estimar la variación del tipo de cambio."
@@ -73,20 +71,44 @@ class ForecastService:
 
     # ------------------------------------------------------------------
     def _fit_trend_model(self, snapshots: list[RateSnapshot]) -> TrendModel:
-        ordered = list(sorted(snapshots, key=lambda s: s.timestamp))
+        ordered = _chronological(snapshots)
+        count = len(ordered)
+        hours = np.empty(count, dtype=np.float64)
+        mid_rates = np.empty(count, dtype=np.float64)
         base = ordered[0].timestamp
-        hours = np.array([
-            (snap.timestamp - base).total_seconds() / 3600.0 for snap in ordered
-        ])
-        mid_rates = np.array([snap.mid_rate for snap in ordered])
-        slope, intercept = np.polyfit(hours, mid_rates, 1)
-        predicted = intercept + slope * hours
-        residuals = mid_rates - predicted
-        std_error = float(np.std(residuals))
-        return TrendModel(intercept=float(intercept), slope_per_hour=float(slope), std_error=std_error)
+        for index, snap in enumerate(ordered):
+            hours[index] = (snap.timestamp - base).total_seconds() / 3600.0
+            mid_rates[index] = snap.mid_rate
+        intercept, slope, std_error = fit_line(hours, mid_rates)
+        return TrendModel(intercept=intercept, slope_per_hour=slope, std_error=std_error)
 
     def _hours_until_close(self, timestamp: datetime) -> float:
         local_ts = timestamp.astimezone(self._timezone)
-        end_of_day = datetime.combine(local_ts.date(), time(hour=23, minute=59), tzinfo=self._timezone)
+        _, end_of_day = _day_bounds(local_ts.date(), self._timezone)
         delta = end_of_day - local_ts
         return max(delta.total_seconds() / 3600.0, 0.0)
+
+
+@lru_cache(maxsize=32)
+def _day_bounds(day: date, timezone: ZoneInfo) -> tuple[datetime, datetime]:
+    """Inicio del día y hora de cierre (23:59) en la zona horaria del mercado."""
+
+    return (
+        datetime.combine(day, time.min, tzinfo=timezone),
+        datetime.combine(day, time(hour=23, minute=59), tzinfo=timezone),
+    )
+
+
+def _chronological(snapshots: list[RateSnapshot]) -> list[RateSnapshot]:
+    """Ordena por timestamp evitando el sort cuando la lista ya viene ordenada.
+
+    El repositorio entrega los snapshots del más reciente al más antiguo, así que
+    basta con invertirlos.
+    """
+
+    timestamps = [snap.timestamp for snap in snapshots]
+    if all(earlier >= later for earlier, later in zip(timestamps, timestamps[1:])):
+        return snapshots[::-1]
+    if all(earlier <= later for earlier, later in zip(timestamps, timestamps[1:])):
+        return snapshots
+    return sorted(snapshots, key=lambda s: s.timestamp)
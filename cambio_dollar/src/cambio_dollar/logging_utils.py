@@ -33,14 +33,11 @@ def configure_logging(level_name: str, *, force: bool = False) -> None:
     level = _resolve_level(level_name)
     root = logging.getLogger()
 
+    # basicConfig no hace nada si ya hay handlers: handlers ajenos sin ``force`` se
+    # respetan hasta la primera configuración propia.
     if not root.handlers:
         logging.basicConfig(level=level)
-    elif force:
-        for handler in root.handlers:
-            handler.setLevel(level)
-    elif not _CONFIGURED:
-        logging.basicConfig(level=level)
-    else:
+    elif force or _CONFIGURED:
         for handler in root.handlers:
             handler.setLevel(level)
 
@@ -4,7 +4,9 @@ from logging.config import fileConfig
 from pathlib import Path
 
 from alembic import context
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, event, pool
+
+from cambio_dollar.db_migrations import configure_connection
 
 # Interpret the config file for Python logging.
 if context.config.config_file_name is not None:
@@ -23,6 +25,10 @@ def _ensure_sqlalchemy_url() -> None:
     config.set_main_option("sqlalchemy.url", f"sqlite+pysqlite:///{db_path}")
 
 
+def _on_connect(dbapi_connection, _connection_record) -> None:
+    configure_connection(dbapi_connection)
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
 
@@ -48,6 +54,7 @@ def run_migrations_online() -> None:
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
+    event.listen(connectable, "connect", _on_connect)
 
     with connectable.connect() as connection:
         context.configure(connection=connection, target_metadata=None)
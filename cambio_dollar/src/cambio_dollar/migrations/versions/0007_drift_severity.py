@@ -23,18 +23,8 @@ def upgrade() -> None:
             )
         )
 
-
-    op.execute(
-        sa.text(
-            """
-            UPDATE drift_events
-            SET severity = 'LOW'
-            WHERE severity IS NULL
-            """
-        )
-    )
-
-
+    # Las filas existentes reciben 'LOW' del server_default al agregar la columna
+    # NOT NULL, así que no hace falta un UPDATE de relleno sobre toda la tabla.
     with op.batch_alter_table("drift_events", schema=None) as batch_op:
         batch_op.alter_column("severity", server_default=None)
 
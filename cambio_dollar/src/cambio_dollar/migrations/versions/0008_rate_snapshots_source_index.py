@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_rate_snapshots_source_index"
+down_revision: str | None = "0007_drift_severity"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "idx_rate_snapshots_source_timestamp",
+        "rate_snapshots",
+        ["source", "timestamp"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_rate_snapshots_source_timestamp", table_name="rate_snapshots")
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_rate_snapshots_covering_index"
+down_revision: str | None = "0008_rate_snapshots_source_index"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Índice cubriente: latest_by_provider se resuelve sin leer la tabla.
+    op.create_index(
+        "idx_rate_snapshots_source_ts_covering",
+        "rate_snapshots",
+        ["source", sa.text("timestamp DESC"), "buy_rate", "sell_rate", "confidence"],
+    )
+    op.drop_index("idx_rate_snapshots_source_timestamp", table_name="rate_snapshots")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "idx_rate_snapshots_source_timestamp",
+        "rate_snapshots",
+        ["source", "timestamp"],
+    )
+    op.drop_index("idx_rate_snapshots_source_ts_covering", table_name="rate_snapshots")
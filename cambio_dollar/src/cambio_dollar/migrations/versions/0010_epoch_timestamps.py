@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_epoch_timestamps"
+down_revision: str | None = "0009_rate_snapshots_covering_index"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _iso_to_epoch_us(value: str) -> int:
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _epoch_us_to_iso(value: int) -> str:
+    return (_EPOCH + value * _MICROSECOND).isoformat()
+
+
+def _convert_column(table: str, target_type: sa.types.TypeEngine, convert: Callable[..., object]) -> None:
+    # SQLite no permite cambiar el tipo en sitio: columna auxiliar, copia convertida y renombre.
+    bind = op.get_bind()
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.add_column(sa.Column("timestamp_converted", target_type, nullable=True))
+    rows = bind.execute(sa.text(f"SELECT id, timestamp FROM {table}")).fetchall()
+    if rows:
+        bind.execute(
+            sa.text(f"UPDATE {table} SET timestamp_converted = :value WHERE id = :id"),
+            [{"id": row_id, "value": convert(value)} for row_id, value in rows],
+        )
+    op.drop_index(f"idx_{table}_timestamp", table_name=table)
+    with op.batch_alter_table(table) as batch_op:
+        batch_op.drop_column("timestamp")
+        batch_op.alter_column(
+            "timestamp_converted",
+            new_column_name="timestamp",
+            existing_type=target_type,
+            nullable=False,
+        )
+    # En consensus_snapshots el índice único reemplaza al UNIQUE implícito de la columna.
+    op.create_index(
+        f"idx_{table}_timestamp",
+        table,
+        ["timestamp"],
+        unique=table == "consensus_snapshots",
+    )
+
+
+def upgrade() -> None:
+    # Microsegundos UTC desde epoch: comparaciones enteras y claves de índice de 8 bytes.
+    for table in ("consensus_snapshots", "drift_events"):
+        _convert_column(table, sa.BigInteger(), _iso_to_epoch_us)
+
+
+def downgrade() -> None:
+    for table in ("consensus_snapshots", "drift_events"):
+        _convert_column(table, sa.Text(), _epoch_us_to_iso)
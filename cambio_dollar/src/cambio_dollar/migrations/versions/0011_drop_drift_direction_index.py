@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_drop_drift_direction_index"
+down_revision: str | None = "0010_epoch_timestamps"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Ninguna consulta filtra por dirección; las lecturas usan idx_drift_events_timestamp.
+    op.drop_index("idx_drift_events_direction", table_name="drift_events")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "idx_drift_events_direction",
+        "drift_events",
+        ["direction"],
+    )
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0012_list_query_indexes"
+down_revision: str | None = "0011_drop_drift_direction_index"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+# Tablas leídas con ``ORDER BY <tiempo> DESC LIMIT n`` que no tenían índice temporal.
+_TIME_INDEXES: tuple[tuple[str, str, list[str]], ...] = (
+    ("idx_rate_snapshots_timestamp", "rate_snapshots", ["timestamp"]),
+    ("idx_trades_timestamp", "trades", ["timestamp"]),
+    ("idx_strategy_recommendations_generated_at", "strategy_recommendations", ["generated_at"]),
+)
+
+# Filtros de igualdad seguidos de la columna de orden: el recorrido sale ya ordenado.
+# (nuevo índice, tabla, columnas, índice que reemplaza o None, columnas del reemplazado)
+_COMPOSITE_INDEXES: tuple[tuple[str, str, list[str], str | None, list[str]], ...] = (
+    (
+        "idx_feature_store_scope_version_ts",
+        "feature_store",
+        ["scope", "feature_version", "snapshot_timestamp"],
+        None,
+        [],
+    ),
+    (
+        "idx_labels_horizon_snapshot",
+        "labels_performance",
+        ["horizon_minutes", "snapshot_timestamp"],
+        None,
+        [],
+    ),
+    (
+        "idx_external_macro_source_metric_ts",
+        "external_macro",
+        ["source", "metric", "timestamp"],
+        None,
+        [],
+    ),
+    (
+        "idx_model_evaluations_ident_recorded",
+        "model_evaluations",
+        ["model_name", "model_version", "metric_name", "recorded_at"],
+        "idx_model_evaluations_ident",
+        ["model_name", "model_version", "metric_name"],
+    ),
+    (
+        "idx_provider_fetch_metrics_provider_ts",
+        "provider_fetch_metrics",
+        ["provider", "timestamp"],
+        "idx_provider_fetch_metrics_provider",
+        ["provider"],
+    ),
+    (
+        "idx_provider_metrics_provider_window_end",
+        "provider_metrics",
+        ["provider", "window_end"],
+        "idx_provider_metrics_provider",
+        ["provider"],
+    ),
+    (
+        "idx_provider_error_samples_provider_ts",
+        "provider_error_samples",
+        ["provider", "timestamp"],
+        "idx_provider_error_samples_provider",
+        ["provider"],
+    ),
+    (
+        "idx_anomaly_events_provider_ts",
+        "anomaly_events",
+        ["provider", "timestamp"],
+        "idx_anomaly_events_provider",
+        ["provider"],
+    ),
+)
+
+
+def upgrade() -> None:
+    for name, table, columns in _TIME_INDEXES:
+        op.create_index(name, table, columns)
+    for name, table, columns, replaced, _ in _COMPOSITE_INDEXES:
+        op.create_index(name, table, columns)
+        if replaced is not None:
+            # El índice compuesto cubre también las búsquedas por su prefijo.
+            op.drop_index(replaced, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table, _, replaced, replaced_columns in reversed(_COMPOSITE_INDEXES):
+        if replaced is not None:
+            op.create_index(replaced, table, replaced_columns)
+        op.drop_index(name, table_name=table)
+    for name, table, _ in reversed(_TIME_INDEXES):
+        op.drop_index(name, table_name=table)
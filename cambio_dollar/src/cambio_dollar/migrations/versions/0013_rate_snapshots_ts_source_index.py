@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0013_rate_snapshots_ts_source_index"
+down_revision: str | None = "0012_list_query_indexes"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # Índice no único: varias filas pueden compartir (timestamp, source) (proveedores que
+    # publican solo la fecha, filas repetidas de una tabla HTML). save_snapshots lo usa
+    # para descartar repeticiones idénticas; no se borra ninguna fila existente.
+    # También sirve los ORDER BY timestamp y reemplaza al índice simple.
+    op.create_index(
+        "idx_rate_snapshots_timestamp_source",
+        "rate_snapshots",
+        ["timestamp", "source"],
+    )
+    op.drop_index("idx_rate_snapshots_timestamp", table_name="rate_snapshots")
+
+
+def downgrade() -> None:
+    op.create_index("idx_rate_snapshots_timestamp", "rate_snapshots", ["timestamp"])
+    op.drop_index("idx_rate_snapshots_timestamp_source", table_name="rate_snapshots")
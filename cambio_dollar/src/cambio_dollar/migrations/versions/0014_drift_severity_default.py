@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0014_drift_severity_default"
+down_revision: str | None = "0013_rate_snapshots_ts_source_index"
+branch_labels: Sequence[str] | None = None
+depends_on: Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # 0007 retiró el default tras agregar la columna; los eventos sin severidad explícita
+    # vuelven a registrarse como 'LOW'.
+    with op.batch_alter_table("drift_events", schema=None) as batch_op:
+        batch_op.alter_column(
+            "severity",
+            existing_type=sa.Text(),
+            existing_nullable=False,
+            server_default="LOW",
+        )
+
+    op.execute(
+        sa.text(
+            """
+            UPDATE drift_events
+            SET severity = 'LOW'
+            WHERE severity IS NULL
+            """
+        )
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("drift_events", schema=None) as batch_op:
+        batch_op.alter_column(
+            "severity",
+            existing_type=sa.Text(),
+            existing_nullable=False,
+            server_default=None,
+        )
@@ -10,7 +10,10 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+# El esquema de validación se compila en el primer uso de cada modelo, no al importar.
+_MODEL_CONFIG = ConfigDict(defer_build=True)
 
 
 class TradeAction(str, Enum):
@@ -22,6 +25,8 @@ class TradeAction(str, Enum):
 class RateSnapshot(BaseModel):
     """Representa una lectura puntual del mercado."""
 
+    model_config = _MODEL_CONFIG
+
     timestamp: datetime = Field(description="Fecha y hora de la cotización.")
     buy_rate: float = Field(gt=0, description="Precio en DOP por 1 USD al comprar dólares.")
     sell_rate: float = Field(gt=0, description="Precio en DOP por 1 USD al vender dólares.")
@@ -45,6 +50,8 @@ class RateSnapshot(BaseModel):
 class Trade(BaseModel):
     """Describe una operación de compra o venta de divisa."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Marca de tiempo de la operación")
     action: TradeAction = Field(description="Tipo de operación realizada")
@@ -58,6 +65,8 @@ class Trade(BaseModel):
 class StrategyRecommendation(BaseModel):
     """Recomendación emitida por la estrategia."""
 
+    model_config = _MODEL_CONFIG
+
     action: TradeAction
     score: float = Field(description="Intensidad de la recomendación (0-1)")
     expected_profit: float = Field(description="Ganancia estimada en DOP para el bloque estándar de USD")
@@ -88,6 +97,8 @@ class StrategyRecommendationRecord(StrategyRecommendation):
 class FeatureVectorRecord(BaseModel):
     """Representa un conjunto de features calculados para entrenamiento/inferencia."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Marca de tiempo asociada al conjunto de features")
     feature_version: str = Field(description="Versión del pipeline de features utilizado")
@@ -102,6 +113,8 @@ class FeatureVectorRecord(BaseModel):
 class PerformanceLabel(BaseModel):
     """Etiqueta derivada para entrenamiento supervisado."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     snapshot_timestamp: datetime = Field(description="Marca de tiempo de referencia del snapshot")
     horizon_minutes: int = Field(ge=1, description="Horizonte utilizado para calcular la etiqueta")
@@ -117,6 +130,8 @@ class PerformanceLabel(BaseModel):
 class ExternalMacroMetric(BaseModel):
     """Dato macroeconómico o contextual externo al mercado local."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Marca de tiempo del dato externo")
     source: str = Field(description="Fuente del indicador (e.g. FRED, AlphaVantage)")
@@ -128,6 +143,8 @@ class ExternalMacroMetric(BaseModel):
 class ModelEvaluationRecord(BaseModel):
     """Resultado de la evaluación o backtesting de un modelo."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     model_name: str = Field(description="Nombre lógico del modelo (e.g. lightgbm_baseline)")
     model_version: str = Field(description="Versión o hash del modelo")
@@ -141,6 +158,8 @@ class ModelEvaluationRecord(BaseModel):
 class ForecastResult(BaseModel):
     """Salida del módulo de pronósticos."""
 
+    model_config = _MODEL_CONFIG
+
     generated_at: datetime
     expected_profit_end_day: float
     best_case: float
@@ -154,6 +173,8 @@ class ForecastResult(BaseModel):
 class ProviderValidation(BaseModel):
     """Detalle de la validación cruzada entre proveedores."""
 
+    model_config = _MODEL_CONFIG
+
     provider: str = Field(description="Nombre del proveedor evaluado")
     buy_rate: float = Field(description="Tasa de compra reportada")
     sell_rate: float = Field(description="Tasa de venta reportada")
@@ -177,19 +198,13 @@ class ProviderValidation(BaseModel):
         default=None,
         description="Diferencia firmada frente a la tasa consenso ponderada",
     )
-    difference_vs_weighted: Optional[float] = Field(
-        default=None,
-        description="Diferencia absoluta frente a la tasa consenso ponderada",
-    )
-    weight: Optional[float] = Field(
-        default=None,
-        description="Peso asignado al proveedor en el consenso ponderado",
-    )
 
 
 class ConsensusSnapshot(BaseModel):
     """Resumen consolidado a partir de múltiples proveedores."""
 
+    model_config = _MODEL_CONFIG
+
     timestamp: datetime
     buy_rate: float
     sell_rate: float
@@ -234,6 +249,8 @@ class AnomalySeverity(str, Enum):
 class AnomalyEvent(BaseModel):
     """Evento generado por un detector de anomalías."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de la anomalía")
     timestamp: datetime = Field(description="Instante en el que se produjo la anomalía")
     provider: str = Field(description="Proveedor evaluado")
@@ -249,6 +266,8 @@ class AnomalyEvent(BaseModel):
 class ProviderFetchMetric(BaseModel):
     """Métrica operacional por captura de proveedor."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Momento en que se completó la captura")
     provider: str = Field(description="Nombre del proveedor")
@@ -277,6 +296,8 @@ class ProviderFetchMetric(BaseModel):
 class ProviderReliabilityMetrics(BaseModel):
     """Resumen agregado de confiabilidad para un proveedor en una ventana de tiempo."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     provider: str = Field(description="Proveedor evaluado")
     window_start: datetime = Field(description="Inicio de la ventana evaluada")
@@ -299,6 +320,8 @@ class ProviderReliabilityMetrics(BaseModel):
 class ProviderErrorSample(BaseModel):
     """Registro granular del error de un proveedor frente al consenso."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Instante en el que se evaluó el proveedor")
     provider: str = Field(description="Nombre del proveedor evaluado")
@@ -332,6 +355,8 @@ class ProviderErrorSample(BaseModel):
 class ConsensusSnapshotRecord(BaseModel):
     """Registro persistido de un consenso generado en una captura."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Instante del consenso")
     buy_rate: float = Field(description="Tasa de compra mediana")
@@ -359,6 +384,8 @@ class DriftSeverity(str, Enum):
 class DriftEvent(BaseModel):
     """Evento que describe un cambio de régimen detectado por el monitor de drift."""
 
+    model_config = _MODEL_CONFIG
+
     id: Optional[int] = Field(default=None, description="Identificador de base de datos")
     timestamp: datetime = Field(description="Instante del evento")
     direction: DriftDirection = Field(description="Dirección del shift detectado")
@@ -372,4 +399,16 @@ class DriftEvent(BaseModel):
     metadata: Optional[Dict[str, Any]] = Field(default=None, description="Detalles adicionales")
 
 
-ConsensusSnapshot.model_rebuild()
+# Validación por lotes: un solo recorrido en pydantic-core por lista de modelos.
+RATE_SNAPSHOT_LIST: TypeAdapter[List[RateSnapshot]] = TypeAdapter(
+    List[RateSnapshot], config=ConfigDict(defer_build=True)
+)
+PROVIDER_VALIDATION_LIST: TypeAdapter[List[ProviderValidation]] = TypeAdapter(
+    List[ProviderValidation], config=ConfigDict(defer_build=True)
+)
+PROVIDER_FETCH_METRIC_LIST: TypeAdapter[List[ProviderFetchMetric]] = TypeAdapter(
+    List[ProviderFetchMetric], config=ConfigDict(defer_build=True)
+)
+PROVIDER_ERROR_SAMPLE_LIST: TypeAdapter[List[ProviderErrorSample]] = TypeAdapter(
+    List[ProviderErrorSample], config=ConfigDict(defer_build=True)
+)
@@ -8,12 +8,19 @@ from __future__ import annotations
 
 import json
 import sqlite3
+import sys
+import threading
 from contextlib import contextmanager
+from dataclasses import dataclass
+from itertools import chain
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Iterable, Iterator, List, Optional
+from zoneinfo import ZoneInfo
 
-from .db_migrations import upgrade_database
+import numpy as np
+
+from .db_migrations import configure_connection, upgrade_database
 from .models import (
     ExternalMacroMetric,
     FeatureVectorRecord,
@@ -29,32 +36,207 @@ from .models import (
     ProviderFetchMetric,
     ProviderErrorSample,
     ConsensusSnapshotRecord,
+    PROVIDER_ERROR_SAMPLE_LIST,
+    PROVIDER_FETCH_METRIC_LIST,
+    RATE_SNAPSHOT_LIST,
     DriftEvent,
     DriftDirection,
     DriftSeverity,
 )
 
+try:  # orjson es opcional (extra ``speedups``); acelera la lectura de columnas JSON.
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None  # type: ignore[assignment]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_us(moment: datetime) -> int:
+    """Microsegundos UTC desde epoch; un timestamp sin zona no identifica un instante."""
+
+    if moment.tzinfo is None or moment.utcoffset() is None:
+        raise ValueError(f"Se requiere un datetime con zona horaria para almacenarlo como epoch: {moment!r}")
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _decode_json(raw: str) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # json.dumps escribe NaN/Infinity, que orjson no acepta.
+            pass
+    return json.loads(raw)
+
+
+def _rows_to_snapshots(rows: list[tuple[Any, ...]]) -> List[RateSnapshot]:
+    # Un solo validate_python para todo el lote en vez de un RateSnapshot(...) por fila.
+    # ``sys.intern`` hace que todas las filas de un proveedor compartan el mismo str.
+    # Filas como tuplas (ver ``_fetch_tuples``) en el orden timestamp, buy, sell, source, confidence.
+    return RATE_SNAPSHOT_LIST.validate_python(
+        [
+            {
+                "timestamp": datetime.fromisoformat(timestamp),
+                "buy_rate": buy_rate,
+                "sell_rate": sell_rate,
+                "source": sys.intern(source),
+                "confidence": confidence,
+            }
+            for timestamp, buy_rate, sell_rate, source, confidence in rows
+        ]
+    )
+
+
+def _fetch_tuples(conn: sqlite3.Connection, query: str, params: Iterable[Any] = ()) -> list[tuple[Any, ...]]:
+    # En lecturas masivas las tuplas evitan la búsqueda por nombre de ``sqlite3.Row``.
+    cursor = conn.execute(query, tuple(params))
+    cursor.row_factory = None
+    return cursor.fetchall()
+
+
+def _fetch_scalar(conn: sqlite3.Connection, query: str, params: Iterable[Any] = ()) -> Any:
+    # Primera columna de la primera fila, sin construir un ``sqlite3.Row`` para un solo valor.
+    cursor = conn.execute(query, tuple(params))
+    cursor.row_factory = None
+    row = cursor.fetchone()
+    return None if row is None else row[0]
+
+
+# Último snapshot de cada fuente, del más reciente al más antiguo. El CTE recursivo salta
+# de fuente en fuente sobre el índice (source, timestamp) y cada una resuelve su último
+# snapshot con una sola búsqueda: O(proveedores · log n) en vez de recorrer el histórico.
+# A igual timestamp gana la fila insertada al final (p. ej. la tasa revisada del día).
+_LATEST_BY_PROVIDER_SQL = """
+    WITH RECURSIVE sources(source) AS (
+        SELECT MIN(source) FROM rate_snapshots
+        UNION ALL
+        SELECT (SELECT MIN(source) FROM rate_snapshots WHERE source > sources.source)
+        FROM sources
+        WHERE sources.source IS NOT NULL
+    )
+    SELECT latest.timestamp, latest.buy_rate, latest.sell_rate, latest.source, latest.confidence
+    FROM sources
+    JOIN rate_snapshots AS latest ON latest.id = (
+        SELECT id
+        FROM rate_snapshots
+        WHERE source = sources.source
+        ORDER BY timestamp DESC, id DESC
+        LIMIT 1
+    )
+    ORDER BY latest.timestamp DESC, latest.id
+"""
+
+
+@dataclass(frozen=True)
+class ProviderSnapshotTable:
+    """Último snapshot por proveedor en columnas (SoA) para reducciones NumPy."""
+
+    providers: list[str]
+    buy: np.ndarray
+    sell: np.ndarray
+    mid: np.ndarray
+    timestamps: list[datetime]
+
+    def __len__(self) -> int:
+        return len(self.providers)
+
+
+@dataclass(frozen=True)
+class FeatureMatrix:
+    """Features de varias filas del feature store apiladas en una matriz ``(N, F)``."""
+
+    timestamps: list[datetime]
+    feature_names: list[str]
+    values: np.ndarray
+
 
 class MarketRepository:
     """Repositorio SQLite para snapshots y operaciones."""
 
-    def __init__(self, db_path: Path) -> None:
+    def __init__(self, db_path: Path, *, timezone: str) -> None:
         self._db_path = db_path
+        # consensus_snapshots y drift_events guardan microsegundos UTC desde epoch (el resto
+        # de tablas, texto ISO); al leerlos se devuelven en esta zona, que fija el llamador.
+        self._timezone = ZoneInfo(timezone)
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Una conexión por hilo que vive lo mismo que el repositorio: los PRAGMA se
+        # aplican una vez y la caché de páginas de SQLite se mantiene caliente.
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
         self._initialize()
 
     @contextmanager
     def _connection(self) -> Iterator[sqlite3.Connection]:
-        conn = sqlite3.connect(self._db_path, detect_types=sqlite3.PARSE_DECLTYPES)
-        conn.row_factory = sqlite3.Row
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
         try:
             yield conn
-        finally:
+        except BaseException:
+            # Sin cerrar la conexión hay que descartar a mano la transacción a medias;
+            # dentro de ``transaction`` la decisión corresponde al bloque externo.
+            if conn.in_transaction and not getattr(self._local, "batched", False):
+                conn.rollback()
+            raise
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Agrupa las escrituras del hilo actual en una sola transacción.
+
+        Los ``save_*``/``record_*`` llamados dentro del bloque omiten su ``commit``
+        propio; todo se confirma al salir o se revierte si hay una excepción.
+        """
+
+        if getattr(self._local, "batched", False):
+            yield
+            return
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.batched = True
+            try:
+                yield
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.batched = False
+
+    def _commit(self, conn: sqlite3.Connection) -> None:
+        if not getattr(self._local, "batched", False):
+            conn.commit()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        # ``check_same_thread=False`` solo para que ``close`` pueda cerrarla desde otro hilo.
+        # Sin ``detect_types``: ninguna columna declara un tipo con conversor registrado
+        # y los timestamps se convierten a mano.
+        conn = sqlite3.connect(self._db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        configure_connection(conn)
+        with self._connections_lock:
+            self._connections.append(conn)
+        self._local.conn = conn
+        return conn
+
+    def close(self) -> None:
+        """Cierra las conexiones abiertas por todos los hilos."""
+
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
             conn.close()
+        self._local = threading.local()
 
     def _initialize(self) -> None:
         upgrade_database(self._db_path)
 
+    def _from_epoch_us(self, value: int) -> datetime:
+        return (_EPOCH + value * _MICROSECOND).astimezone(self._timezone)
+
     @staticmethod
     def _dump_json(data: Optional[dict[str, Any]]) -> Optional[str]:
         if data is None:
@@ -66,27 +248,46 @@ class MarketRepository:
         if raw is None or raw == "":
             return None
         try:
-            return json.loads(raw)
+            return _decode_json(raw)
         except json.JSONDecodeError:
             return None
 
     # --- Rate snapshots -------------------------------------------------
     def save_snapshot(self, snapshot: RateSnapshot) -> None:
+        self.save_snapshots([snapshot])
+
+    def save_snapshots(self, snapshots: Iterable[RateSnapshot]) -> None:
+        # executemany consume el generador fila a fila: la entrada no se materializa.
+        # Solo se descarta la repetición idéntica de una fila ya guardada (mismo sondeo de
+        # un proveedor que publica solo la fecha); una tasa revisada con el mismo
+        # (timestamp, source) se agrega como fila nueva y conserva el historial.
         with self._connection() as conn:
-            conn.execute(
+            conn.executemany(
                 """
                 INSERT INTO rate_snapshots (timestamp, buy_rate, sell_rate, source, confidence)
-                VALUES (?, ?, ?, ?, ?)
+                SELECT :timestamp, :buy_rate, :sell_rate, :source, :confidence
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM rate_snapshots
+                    WHERE timestamp = :timestamp
+                        AND source = :source
+                        AND buy_rate = :buy_rate
+                        AND sell_rate = :sell_rate
+                        AND confidence IS :confidence
+                )
                 """,
                 (
-                    snapshot.timestamp.isoformat(),
-                    snapshot.buy_rate,
-                    snapshot.sell_rate,
-                    snapshot.source,
-                    snapshot.confidence,
+                    {
+                        "timestamp": snapshot.timestamp.isoformat(),
+                        "buy_rate": snapshot.buy_rate,
+                        "sell_rate": snapshot.sell_rate,
+                        "source": snapshot.source,
+                        "confidence": snapshot.confidence,
+                    }
+                    for snapshot in snapshots
                 ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def get_latest_snapshot(self) -> Optional[RateSnapshot]:
         with self._connection() as conn:
@@ -114,7 +315,39 @@ class MarketRepository:
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         limit: Optional[int] = None,
+        ascending: bool = False,
     ) -> List[RateSnapshot]:
+        query, params = self._snapshot_query(since=since, until=until, limit=limit, ascending=ascending)
+        with self._connection() as conn:
+            rows = _fetch_tuples(conn, query, params)
+        return _rows_to_snapshots(rows)
+
+    def iter_snapshots_stream(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        ascending: bool = False,
+        chunk_size: int = 1000,
+    ) -> Iterator[RateSnapshot]:
+        """Como ``iter_snapshots`` pero en bloques de ``chunk_size`` filas, sin materializar la lista."""
+
+        query, params = self._snapshot_query(since=since, until=until, limit=limit, ascending=ascending)
+        with self._connection() as conn:
+            cursor = conn.execute(query, params)
+            cursor.row_factory = None
+            while rows := cursor.fetchmany(chunk_size):
+                yield from _rows_to_snapshots(rows)
+
+    @staticmethod
+    def _snapshot_query(
+        *,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        limit: Optional[int],
+        ascending: bool,
+    ) -> tuple[str, list[object]]:
         query = (
             "SELECT timestamp, buy_rate, sell_rate, source, confidence "
             "FROM rate_snapshots"
@@ -129,45 +362,36 @@ class MarketRepository:
             params.append(until.isoformat())
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
-        query += " ORDER BY timestamp DESC"
+        query += " ORDER BY timestamp ASC, id ASC" if ascending else " ORDER BY timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
-        with self._connection() as conn:
-            rows = conn.execute(query, params).fetchall()
-        return [
-            RateSnapshot(
-                timestamp=datetime.fromisoformat(row["timestamp"]),
-                buy_rate=row["buy_rate"],
-                sell_rate=row["sell_rate"],
-                source=row["source"],
-                confidence=row["confidence"],
-            )
-            for row in rows
-        ]
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return query, params
 
     def latest_by_provider(self) -> dict[str, RateSnapshot]:
+        # SQLite resuelve el último snapshot de cada fuente (índice source, timestamp);
+        # el dict conserva el orden del más reciente al más antiguo.
         with self._connection() as conn:
-            rows = conn.execute(
-                """
-                SELECT timestamp, buy_rate, sell_rate, source, confidence
-                FROM rate_snapshots
-                ORDER BY timestamp DESC
-                """
-            ).fetchall()
-
-        snapshot_map: dict[str, RateSnapshot] = {}
-        for row in rows:
-            source = row["source"]
-            if source in snapshot_map:
-                continue
-            snapshot_map[source] = RateSnapshot(
-                timestamp=datetime.fromisoformat(row["timestamp"]),
-                buy_rate=row["buy_rate"],
-                sell_rate=row["sell_rate"],
-                source=source,
-                confidence=row["confidence"],
-            )
-        return snapshot_map
+            rows = _fetch_tuples(conn, _LATEST_BY_PROVIDER_SQL)
+
+        return {snapshot.source: snapshot for snapshot in _rows_to_snapshots(rows)}
+
+    def snapshot_table(self) -> ProviderSnapshotTable:
+        """Igual que ``latest_by_provider`` pero en columnas, sin instanciar modelos."""
+
+        with self._connection() as conn:
+            rows = conn.execute(_LATEST_BY_PROVIDER_SQL).fetchall()
+
+        count = len(rows)
+        buy = np.fromiter((row["buy_rate"] for row in rows), dtype=np.float64, count=count)
+        sell = np.fromiter((row["sell_rate"] for row in rows), dtype=np.float64, count=count)
+        return ProviderSnapshotTable(
+            providers=[row["source"] for row in rows],
+            buy=buy,
+            sell=sell,
+            mid=(buy + sell) / 2,
+            timestamps=[datetime.fromisoformat(row["timestamp"]) for row in rows],
+        )
 
     # --- Consensus snapshots ---------------------------------------------
     def save_consensus_snapshot(self, record: ConsensusSnapshotRecord) -> None:
@@ -188,7 +412,7 @@ class MarketRepository:
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
-                    record.timestamp.isoformat(),
+                    _to_epoch_us(record.timestamp),
                     record.buy_rate,
                     record.sell_rate,
                     record.mid_rate,
@@ -200,7 +424,7 @@ class MarketRepository:
                     self._dump_json(record.metadata),
                 ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def list_consensus_snapshots(
         self,
@@ -209,6 +433,44 @@ class MarketRepository:
         limit: Optional[int] = None,
         desc: bool = True,
     ) -> List[ConsensusSnapshotRecord]:
+        query, params = self._consensus_query(since=since, limit=limit, desc=desc)
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._row_to_consensus(row) for row in rows]
+
+    def iter_consensus_snapshots(
+        self,
+        *,
+        since: Optional[datetime] = None,
+        desc: bool = False,
+        latest: Optional[int] = None,
+        chunk_size: int = 500,
+    ) -> Iterator[ConsensusSnapshotRecord]:
+        """Recorre los consensos en bloques de ``chunk_size`` filas sin materializarlos todos.
+
+        ``latest`` acota el recorrido a los N consensos más recientes, que se entregan
+        igualmente en el orden pedido por ``desc``.
+        """
+
+        if latest is not None and not desc:
+            # Se toman los N más recientes y se reordenan cronológicamente.
+            query, params = self._consensus_query(since=since, limit=latest, desc=True)
+            query = f"SELECT * FROM ({query}) ORDER BY timestamp ASC"
+        else:
+            query, params = self._consensus_query(since=since, limit=latest, desc=desc)
+        with self._connection() as conn:
+            cursor = conn.execute(query, params)
+            while rows := cursor.fetchmany(chunk_size):
+                for row in rows:
+                    yield self._row_to_consensus(row)
+
+    @staticmethod
+    def _consensus_query(
+        *,
+        since: Optional[datetime],
+        limit: Optional[int],
+        desc: bool,
+    ) -> tuple[str, list[object]]:
         query = (
             "SELECT id, timestamp, buy_rate, sell_rate, mid_rate, weighted_buy_rate, weighted_sell_rate, "
             "weighted_mid_rate, divergence_range, provider_count, metadata FROM consensus_snapshots"
@@ -217,31 +479,30 @@ class MarketRepository:
         params: list[object] = []
         if since is not None:
             clauses.append("timestamp >= ?")
-            params.append(since.isoformat())
+            params.append(_to_epoch_us(since))
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
         order = "DESC" if desc else "ASC"
         query += f" ORDER BY timestamp {order}"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
-        with self._connection() as conn:
-            rows = conn.execute(query, params).fetchall()
-        return [
-            ConsensusSnapshotRecord(
-                id=row["id"],
-                timestamp=datetime.fromisoformat(row["timestamp"]),
-                buy_rate=row["buy_rate"],
-                sell_rate=row["sell_rate"],
-                mid_rate=row["mid_rate"],
-                weighted_buy_rate=row["weighted_buy_rate"],
-                weighted_sell_rate=row["weighted_sell_rate"],
-                weighted_mid_rate=row["weighted_mid_rate"],
-                divergence_range=row["divergence_range"],
-                provider_count=row["provider_count"],
-                metadata=self._load_json(row["metadata"]),
-            )
-            for row in rows
-        ]
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return query, params
+
+    def _row_to_consensus(self, row: sqlite3.Row) -> ConsensusSnapshotRecord:
+        return ConsensusSnapshotRecord(
+            id=row["id"],
+            timestamp=self._from_epoch_us(row["timestamp"]),
+            buy_rate=row["buy_rate"],
+            sell_rate=row["sell_rate"],
+            mid_rate=row["mid_rate"],
+            weighted_buy_rate=row["weighted_buy_rate"],
+            weighted_sell_rate=row["weighted_sell_rate"],
+            weighted_mid_rate=row["weighted_mid_rate"],
+            divergence_range=row["divergence_range"],
+            provider_count=row["provider_count"],
+            metadata=self._load_json(row["metadata"]),
+        )
 
     # --- Trades ---------------------------------------------------------
     def save_trade(self, trade: Trade) -> Trade:
@@ -261,7 +522,7 @@ class MarketRepository:
                     trade.profit_dop,
                 ),
             )
-            conn.commit()
+            self._commit(conn)
             trade.id = cursor.lastrowid
         return trade
 
@@ -270,10 +531,12 @@ class MarketRepository:
             "SELECT id, timestamp, action, usd_amount, rate, fees, dop_amount, profit_dop "
             "FROM trades ORDER BY timestamp DESC"
         )
+        params: list[object] = []
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
-            rows = conn.execute(query).fetchall()
+            rows = conn.execute(query, params).fetchall()
         return [self._row_to_trade(row) for row in rows]
 
     def get_profit_summary(
@@ -287,8 +550,8 @@ class MarketRepository:
             query += " WHERE timestamp >= ?"
             params.append(since.isoformat())
         with self._connection() as conn:
-            row = conn.execute(query, params).fetchone()
-        return float(row[0] or 0.0)
+            total = _fetch_scalar(conn, query, params)
+        return float(total or 0.0)
 
     def _row_to_trade(self, row: sqlite3.Row) -> Trade:
         return Trade(
@@ -323,7 +586,7 @@ class MarketRepository:
                     trade.id,
                 ),
             )
-            conn.commit()
+            self._commit(conn)
             if cursor.rowcount == 0:
                 return None  # No trade found with the given ID
             return trade
@@ -331,7 +594,7 @@ class MarketRepository:
     def delete_trade(self, trade_id: int) -> bool:
         with self._connection() as conn:
             cursor = conn.execute("DELETE FROM trades WHERE id = ?", (trade_id,))
-            conn.commit()
+            self._commit(conn)
             return cursor.rowcount > 0
 
     # --- Strategy recommendations ---------------------------------------
@@ -361,7 +624,7 @@ class MarketRepository:
                     record.spread_advantage,
                 ),
             )
-            conn.commit()
+            self._commit(conn)
             record.id = cursor.lastrowid
         return record
 
@@ -386,10 +649,12 @@ class MarketRepository:
             "suggested_buy_rate, suggested_sell_rate, spread_advantage "
             "FROM strategy_recommendations ORDER BY generated_at DESC"
         )
+        params: list[object] = []
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
-            rows = conn.execute(query).fetchall()
+            rows = conn.execute(query, params).fetchall()
         return [self._row_to_recommendation(row) for row in rows]
 
     def _row_to_recommendation(self, row: sqlite3.Row) -> StrategyRecommendationRecord:
@@ -426,7 +691,7 @@ class MarketRepository:
                     self._dump_json(record.metadata),
                 ),
             )
-            conn.commit()
+            self._commit(conn)
             record.id = cursor.lastrowid
         return record
 
@@ -438,10 +703,86 @@ class MarketRepository:
         since: Optional[datetime] = None,
         limit: Optional[int] = None,
     ) -> List[FeatureVectorRecord]:
-        query = (
-            "SELECT id, snapshot_timestamp, feature_version, scope, payload, metadata "
-            "FROM feature_store"
+        query, params = self._feature_query(
+            "id, snapshot_timestamp, feature_version, scope, payload, metadata",
+            scope=scope,
+            feature_version=feature_version,
+            since=since,
+            limit=limit,
         )
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            FeatureVectorRecord(
+                id=row["id"],
+                timestamp=datetime.fromisoformat(row["snapshot_timestamp"]),
+                feature_version=row["feature_version"],
+                scope=row["scope"],
+                payload=_decode_json(row["payload"]),
+                metadata=self._load_json(row["metadata"]),
+            )
+            for row in rows
+        ]
+
+    def feature_matrix(
+        self,
+        *,
+        scope: Optional[str] = None,
+        feature_version: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> FeatureMatrix:
+        """Carga los features como una matriz ``(N, F)`` para entrenamiento.
+
+        Mismo filtro y orden que ``list_feature_vectors``, sin construir un modelo por
+        fila. Las columnas siguen el orden de aparición de cada feature; los valores
+        ausentes en una fila quedan como NaN.
+        """
+
+        query, params = self._feature_query(
+            "snapshot_timestamp, payload",
+            scope=scope,
+            feature_version=feature_version,
+            since=since,
+            limit=limit,
+        )
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        timestamps = [datetime.fromisoformat(row["snapshot_timestamp"]) for row in rows]
+        payloads: list[dict[str, float]] = [_decode_json(row["payload"]) for row in rows]
+        if not payloads:
+            return FeatureMatrix(timestamps=[], feature_names=[], values=np.empty((0, 0)))
+
+        names = tuple(payloads[0])
+        if all(tuple(payload) == names for payload in payloads):
+            # Esquema fijo (caso habitual): una sola asignación para toda la matriz.
+            values = np.fromiter(
+                chain.from_iterable(payload.values() for payload in payloads),
+                dtype=np.float64,
+                count=len(payloads) * len(names),
+            ).reshape(len(payloads), len(names))
+            return FeatureMatrix(timestamps=timestamps, feature_names=list(names), values=values)
+
+        columns: dict[str, int] = {}
+        for payload in payloads:
+            for name in payload:
+                columns.setdefault(name, len(columns))
+        values = np.full((len(payloads), len(columns)), np.nan)
+        for row_index, payload in enumerate(payloads):
+            for name, value in payload.items():
+                values[row_index, columns[name]] = value
+        return FeatureMatrix(timestamps=timestamps, feature_names=list(columns), values=values)
+
+    @staticmethod
+    def _feature_query(
+        columns: str,
+        *,
+        scope: Optional[str],
+        feature_version: Optional[str],
+        since: Optional[datetime],
+        limit: Optional[int],
+    ) -> tuple[str, list[object]]:
+        query = f"SELECT {columns} FROM feature_store"
         clauses: list[str] = []
         params: list[object] = []
         if scope is not None:
@@ -457,20 +798,9 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY snapshot_timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
-        with self._connection() as conn:
-            rows = conn.execute(query, params).fetchall()
-        return [
-            FeatureVectorRecord(
-                id=row["id"],
-                timestamp=datetime.fromisoformat(row["snapshot_timestamp"]),
-                feature_version=row["feature_version"],
-                scope=row["scope"],
-                payload=json.loads(row["payload"]),
-                metadata=self._load_json(row["metadata"]),
-            )
-            for row in rows
-        ]
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return query, params
 
     # --- Performance labels --------------------------------------------
     def save_performance_label(self, label: PerformanceLabel) -> PerformanceLabel:
@@ -495,7 +825,7 @@ class MarketRepository:
                     label.created_at.isoformat(),
                 ),
             )
-            conn.commit()
+            self._commit(conn)
             label.id = cursor.lastrowid
         return label
 
@@ -522,7 +852,8 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY snapshot_timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
             rows = conn.execute(query, params).fetchall()
         return [
@@ -557,7 +888,7 @@ class MarketRepository:
                     self._dump_json(metric.metadata),
                 ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def get_macro_series(
         self,
@@ -583,7 +914,8 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
             rows = conn.execute(query, params).fetchall()
         return [
@@ -623,7 +955,7 @@ class MarketRepository:
                     self._dump_json(record.metadata),
                 ),
             )
-            conn.commit()
+            self._commit(conn)
             record.id = cursor.lastrowid
         return record
 
@@ -654,7 +986,8 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY recorded_at DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
             rows = conn.execute(query, params).fetchall()
         return [
@@ -673,9 +1006,7 @@ class MarketRepository:
 
     # --- Provider metrics -----------------------------------------------
     def save_provider_metrics(self, metrics: Iterable[ProviderFetchMetric]) -> None:
-        payload = list(metrics)
-        if not payload:
-            return
+        # executemany consume el generador fila a fila: la entrada no se materializa.
         with self._connection() as conn:
             conn.executemany(
                 """
@@ -691,7 +1022,7 @@ class MarketRepository:
                     metadata
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                [
+                (
                     (
                         metric.timestamp.isoformat(),
                         metric.provider,
@@ -703,10 +1034,10 @@ class MarketRepository:
                         metric.error,
                         self._dump_json(metric.metadata),
                     )
-                    for metric in payload
-                ],
+                    for metric in metrics
+                ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def list_provider_metrics(
         self,
@@ -715,10 +1046,13 @@ class MarketRepository:
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         limit: Optional[int] = None,
+        include_metadata: bool = True,
     ) -> List[ProviderFetchMetric]:
+        # Sin metadata se selecciona NULL: no se materializa el texto ni se decodifica el JSON.
+        metadata_column = "metadata" if include_metadata else "NULL"
         query = (
-            "SELECT id, timestamp, provider, latency_ms, status_code, success, attempts, retries, error, metadata "
-            "FROM provider_fetch_metrics"
+            "SELECT id, timestamp, provider, latency_ms, status_code, success, attempts, retries, error, "
+            f"{metadata_column} FROM provider_fetch_metrics"
         )
         clauses: list[str] = []
         params: list[object] = []
@@ -735,24 +1069,41 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
-            rows = conn.execute(query, params).fetchall()
-        return [
-            ProviderFetchMetric(
-                id=row["id"],
-                timestamp=datetime.fromisoformat(row["timestamp"]),
-                provider=row["provider"],
-                latency_ms=row["latency_ms"],
-                status_code=row["status_code"],
-                success=bool(row["success"]),
-                attempts=row["attempts"],
-                retries=row["retries"],
-                error=row["error"],
-                metadata=self._load_json(row["metadata"]),
-            )
-            for row in rows
-        ]
+            rows = _fetch_tuples(conn, query, params)
+        # Lote completo en un solo validate_python; el agregador lee ventanas de cientos de filas.
+        parse_ts = datetime.fromisoformat
+        load_json = self._load_json
+        return PROVIDER_FETCH_METRIC_LIST.validate_python(
+            [
+                {
+                    "id": metric_id,
+                    "timestamp": parse_ts(timestamp),
+                    "provider": sys.intern(provider_name),
+                    "latency_ms": latency_ms,
+                    "status_code": status_code,
+                    "success": bool(success),
+                    "attempts": attempts,
+                    "retries": retries,
+                    "error": error,
+                    "metadata": load_json(metadata),
+                }
+                for (
+                    metric_id,
+                    timestamp,
+                    provider_name,
+                    latency_ms,
+                    status_code,
+                    success,
+                    attempts,
+                    retries,
+                    error,
+                    metadata,
+                ) in rows
+            ]
+        )
 
     def save_provider_reliability_metrics(
         self,
@@ -798,7 +1149,7 @@ class MarketRepository:
                     metadata=excluded.metadata,
                     created_at=excluded.created_at
                 """,
-                [
+                (
                     (
                         rollup.provider,
                         rollup.window_start.isoformat(),
@@ -818,9 +1169,9 @@ class MarketRepository:
                         (rollup.created_at or now_utc).isoformat(),
                     )
                     for rollup in payload
-                ],
+                ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def list_provider_reliability_metrics(
         self,
@@ -846,7 +1197,8 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY window_end DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
             rows = conn.execute(query, params).fetchall()
         return [
@@ -892,7 +1244,7 @@ class MarketRepository:
                     metadata
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                [
+                (
                     (
                         sample.timestamp.isoformat(),
                         sample.provider,
@@ -905,9 +1257,9 @@ class MarketRepository:
                         self._dump_json(sample.metadata),
                     )
                     for sample in payload
-                ],
+                ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def list_provider_error_samples(
         self,
@@ -916,10 +1268,12 @@ class MarketRepository:
         since: Optional[datetime] = None,
         until: Optional[datetime] = None,
         limit: Optional[int] = None,
+        include_metadata: bool = True,
     ) -> List[ProviderErrorSample]:
+        metadata_column = "metadata" if include_metadata else "NULL"
         query = (
             "SELECT id, timestamp, provider, delta_vs_weighted, delta_vs_consensus, provider_mid,"
-            " weighted_mid, consensus_mid, weight, metadata FROM provider_error_samples"
+            f" weighted_mid, consensus_mid, weight, {metadata_column} FROM provider_error_samples"
         )
         clauses: list[str] = []
         params: list[object] = []
@@ -936,24 +1290,40 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
-            rows = conn.execute(query, params).fetchall()
-        return [
-            ProviderErrorSample(
-                id=row["id"],
-                timestamp=datetime.fromisoformat(row["timestamp"]),
-                provider=row["provider"],
-                delta_vs_weighted=row["delta_vs_weighted"],
-                delta_vs_consensus=row["delta_vs_consensus"],
-                provider_mid=row["provider_mid"],
-                weighted_mid=row["weighted_mid"],
-                consensus_mid=row["consensus_mid"],
-                weight=row["weight"],
-                metadata=self._load_json(row["metadata"]),
-            )
-            for row in rows
-        ]
+            rows = _fetch_tuples(conn, query, params)
+        parse_ts = datetime.fromisoformat
+        load_json = self._load_json
+        return PROVIDER_ERROR_SAMPLE_LIST.validate_python(
+            [
+                {
+                    "id": sample_id,
+                    "timestamp": parse_ts(timestamp),
+                    "provider": sys.intern(provider_name),
+                    "delta_vs_weighted": delta_vs_weighted,
+                    "delta_vs_consensus": delta_vs_consensus,
+                    "provider_mid": provider_mid,
+                    "weighted_mid": weighted_mid,
+                    "consensus_mid": consensus_mid,
+                    "weight": weight,
+                    "metadata": load_json(metadata),
+                }
+                for (
+                    sample_id,
+                    timestamp,
+                    provider_name,
+                    delta_vs_weighted,
+                    delta_vs_consensus,
+                    provider_mid,
+                    weighted_mid,
+                    consensus_mid,
+                    weight,
+                    metadata,
+                ) in rows
+            ]
+        )
 
     # --- Drift events ----------------------------------------------------
     def record_drift_events(self, events: Iterable[DriftEvent]) -> None:
@@ -976,9 +1346,9 @@ class MarketRepository:
                     metadata
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                [
+                (
                     (
-                        event.timestamp.isoformat(),
+                        _to_epoch_us(event.timestamp),
                         event.direction.value,
                         event.metric,
                         event.value,
@@ -990,9 +1360,9 @@ class MarketRepository:
                         self._dump_json(event.metadata),
                     )
                     for event in payload
-                ],
+                ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def list_drift_events(
         self,
@@ -1008,18 +1378,19 @@ class MarketRepository:
         params: list[object] = []
         if since is not None:
             clauses.append("timestamp >= ?")
-            params.append(since.isoformat())
+            params.append(_to_epoch_us(since))
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
             rows = conn.execute(query, params).fetchall()
         return [
             DriftEvent(
                 id=row["id"],
-                timestamp=datetime.fromisoformat(row["timestamp"]),
+                timestamp=self._from_epoch_us(row["timestamp"]),
                 direction=DriftDirection(row["direction"]),
                 metric=row["metric"],
                 value=row["value"],
@@ -1047,7 +1418,7 @@ class MarketRepository:
             return None
         return DriftEvent(
             id=row["id"],
-            timestamp=datetime.fromisoformat(row["timestamp"]),
+            timestamp=self._from_epoch_us(row["timestamp"]),
             direction=DriftDirection(row["direction"]),
             metric=row["metric"],
             value=row["value"],
@@ -1077,7 +1448,7 @@ class MarketRepository:
                     context
                 ) VALUES (?, ?, ?, ?, ?, ?, ?)
                 """,
-                [
+                (
                     (
                         event.timestamp.isoformat(),
                         event.provider,
@@ -1088,9 +1459,9 @@ class MarketRepository:
                         self._dump_json(event.context),
                     )
                     for event in payload
-                ],
+                ),
             )
-            conn.commit()
+            self._commit(conn)
 
     def list_anomalies(
         self,
@@ -1115,7 +1486,8 @@ class MarketRepository:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY timestamp DESC"
         if limit is not None:
-            query += f" LIMIT {int(limit)}"
+            query += " LIMIT ?"
+            params.append(int(limit))
         with self._connection() as conn:
             rows = conn.execute(query, params).fetchall()
         return [
@@ -83,7 +83,7 @@ class CaptureScheduler:
     def _run_capture(self) -> None:
         with self._lock:
             self._last_run = datetime.now(tz=self._timezone)
-        repository = MarketRepository(self.settings.db_path)
+        repository = MarketRepository(self.settings.db_path, timezone=self.settings.timezone)
         service = MarketDataService(repository, self.settings)
         try:
             service.capture_market()
@@ -97,6 +97,7 @@ class CaptureScheduler:
                 self._last_error = None
         finally:
             service.close()
+            repository.close()
 
     def _format_dt(self, value: Optional[datetime]) -> Optional[str]:
         if value is None:
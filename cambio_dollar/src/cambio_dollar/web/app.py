@@ -13,7 +13,7 @@ import csv
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Request, status
 from fastapi.staticfiles import StaticFiles
@@ -144,8 +144,12 @@ def create_app(custom_settings: Optional[Settings] = None) -> FastAPI:
     # Mount static files
     app.mount("/static", StaticFiles(directory=str(Path(__file__).resolve().parent / "static")), name="static")
 
-    def get_repository() -> MarketRepository:
-        return MarketRepository(settings.db_path)
+    def get_repository() -> Iterator[MarketRepository]:
+        repository = MarketRepository(settings.db_path, timezone=settings.timezone)
+        try:
+            yield repository
+        finally:
+            repository.close()
 
     def _collect_provider_status(repository: MarketRepository) -> List[ProviderStatus]:
         latest = repository.latest_by_provider()
@@ -433,17 +437,16 @@ def create_app(custom_settings: Optional[Settings] = None) -> FastAPI:
         day_summary = analyzer.summarize_day()
 
         cutoff_24h = datetime.now(tz=timezone) - timedelta(hours=24)
-        snapshots_24h = repository.iter_snapshots(since=cutoff_24h)
-        
+        # Solo hacen falta las tasas medias: se recorren en bloques sin materializar los snapshots.
+        mid_rates_24h = [s.mid_rate for s in repository.iter_snapshots_stream(since=cutoff_24h)]
+
         trend_24h = None
         volatility = None
-        if len(snapshots_24h) > 1:
-            mid_rates_24h = [s.mid_rate for s in snapshots_24h]
+        if len(mid_rates_24h) > 1:
             # Trend: diferencia entre el más reciente y el más antiguo
-            trend_24h = snapshots_24h[0].mid_rate - snapshots_24h[-1].mid_rate
+            trend_24h = mid_rates_24h[0] - mid_rates_24h[-1]
             # Volatility: desviación estándar de las tasas medias
-            if len(mid_rates_24h) > 1:
-                volatility = statistics.stdev(mid_rates_24h)
+            volatility = statistics.stdev(mid_rates_24h)
 
         best_buy_provider = None
         best_sell_provider = None
@@ -5,7 +5,7 @@ from pathlib import Path
 import pytest
 import numpy as np
 
-from cambio_dollar.analytics import PerformanceAnalyzer, ZScoreAnomalyDetector
+from cambio_dollar.analytics import DriftMonitor, PerformanceAnalyzer, ZScoreAnomalyDetector
 from cambio_dollar.config import Settings
 from cambio_dollar.forecast import ForecastService
 from cambio_dollar.models import (
@@ -35,7 +35,7 @@ def sample_settings(tmp_path: Path) -> Settings:
 
 @pytest.fixture()
 def repository(sample_settings: Settings) -> MarketRepository:
-    repo = MarketRepository(Path(sample_settings.db_path))
+    repo = MarketRepository(Path(sample_settings.db_path), timezone=sample_settings.timezone)
     load_sample_snapshots(repo)
     return repo
 
@@ -69,6 +69,18 @@ def test_forecast_returns_projection(repository: MarketRepository, sample_settin
     assert result.details
 
 
+def test_forecast_trend_ignores_input_order(repository: MarketRepository, sample_settings: Settings) -> None:
+    service = ForecastService(repository, sample_settings)
+    newest_first = repository.iter_snapshots(limit=None)
+    shuffled = newest_first[1::2] + newest_first[::2]
+
+    expected = service._fit_trend_model(newest_first[::-1])
+    for snapshots in (newest_first, shuffled):
+        model = service._fit_trend_model(snapshots)
+        assert model.slope_per_hour == pytest.approx(expected.slope_per_hour, rel=1e-9)
+        assert model.intercept == pytest.approx(expected.intercept, rel=1e-9)
+
+
 def test_analyzer_summarizes_profit(
     repository: MarketRepository, sample_settings: Settings
 ) -> None:
@@ -107,6 +119,23 @@ def test_market_features_use_correct_spread(repository: MarketRepository) -> Non
     assert features.spread_market == pytest.approx(expected_market_spread, rel=1e-6)
 
 
+def test_drift_warmup_matches_sequential_updates(sample_settings: Settings) -> None:
+    tuned_settings = sample_settings.model_copy(
+        update={"drift_cusum_threshold": 0.2, "drift_cooldown_captures": 2}
+    )
+    values = [58.0, 58.1, 58.05, 58.6, 58.9, 59.2, 58.4, 57.9, 57.6, 58.0]
+    timestamp = datetime(2025, 10, 8, 12, tzinfo=UTC)
+
+    sequential = DriftMonitor(tuned_settings)
+    for value in values:
+        sequential.update(timestamp, value)
+    warmed = DriftMonitor(tuned_settings)
+    warmed.warmup(values)
+
+    next_value = 59.5
+    assert warmed.update(timestamp, next_value) == sequential.update(timestamp, next_value)
+
+
 def test_zscore_detector_flags_outliers(sample_settings: Settings) -> None:
     tuned_settings = sample_settings.model_copy(
         update={"anomaly_z_threshold": 2.5, "anomaly_critical_deviation": 1.0}
@@ -12,7 +12,7 @@ from cambio_dollar.repository import MarketRepository
 
 
 def _prepare_repo(db_path: Path) -> None:
-    repository = MarketRepository(db_path)
+    repository = MarketRepository(db_path, timezone=get_settings().timezone)
     event = DriftEvent(
         timestamp=datetime.now(UTC),
         direction=DriftDirection.UP,
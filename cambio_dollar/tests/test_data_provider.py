@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 
 import httpx
 import pytest
+from selectolax.parser import HTMLParser
 
 from cambio_dollar.config import ProviderSettings, Settings
 from cambio_dollar.data_provider import ExchangeRateClient, MarketDataService, ProviderFetchResult, _extract_from_path
@@ -97,11 +99,41 @@ def test_fetch_all_providers_and_consensus(settings: Settings, sample_providers:
         assert consensus.anomalies == []
 
 
+def test_fetch_all_dispatches_providers_concurrently(
+    settings: Settings,
+    sample_providers: list[ProviderSettings],
+) -> None:
+    now = datetime.now(UTC)
+    responses = _mock_responses(now)
+    responses.pop("https://mock.local/popular")
+    in_flight = {"current": 0, "peak": 0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        await asyncio.sleep(0.05)
+        in_flight["current"] -= 1
+        payload = responses.get(str(request.url))
+        if payload is None:
+            return httpx.Response(404, json={"error": "not found"})
+        return httpx.Response(200, json=payload)
+
+    async def run() -> list[ProviderFetchResult]:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as async_client:
+            client = ExchangeRateClient(settings, async_client=async_client)
+            return await client.fetch_all_async()
+
+    results = asyncio.run(run())
+
+    assert in_flight["peak"] == len(sample_providers)
+    assert [result.provider.name for result in results] == ["Banco Central", "Banreservas"]
+
+
 def test_consensus_from_repository(settings: Settings, sample_providers: list[ProviderSettings]) -> None:
     now = datetime.now(UTC)
     transport = _transport_for(_mock_responses(now))
 
-    repo = MarketRepository(settings.db_path)
+    repo = MarketRepository(settings.db_path, timezone=settings.timezone)
     with httpx.Client(transport=transport) as http_client:
         client = ExchangeRateClient(settings, http_client=http_client)
         for result in client.fetch_all():
@@ -218,7 +250,7 @@ def test_capture_market_records_anomaly_events(tmp_path: Path) -> None:
         "https://mock.local/c": {"timestamp": now.timestamp(), "rates": {"mid": 62.0}},
     }
 
-    repo = MarketRepository(settings.db_path)
+    repo = MarketRepository(settings.db_path, timezone=settings.timezone)
     service = MarketDataService(repo, settings)
     transport = _transport_for(responses)
     with httpx.Client(transport=transport) as http_client:
@@ -255,6 +287,8 @@ def test_extract_from_path_supports_list_filters() -> None:
     )
     assert _extract_from_path(payload, "monedas.moneda.1.venta") == pytest.approx(61.0)
     assert _extract_from_path(payload, "monedas.moneda[descripcion=CAD].compra") is None
+    assert _extract_from_path(payload, "monedas.moneda[-1].compra") == pytest.approx(60.0)
+    assert _extract_from_path(payload, "monedas.moneda.5.compra") is None
 
 
 def test_oauth_flow_fetches_token_and_reuses(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
@@ -280,6 +314,7 @@ def test_oauth_flow_fetches_token_and_reuses(monkeypatch: pytest.MonkeyPatch, tm
 
     monkeypatch.setenv("BPD_CLIENT_ID", "client-id")
     monkeypatch.setenv("BPD_CLIENT_SECRET", "client-secret")
+    monkeypatch.setattr(ExchangeRateClient, "_OAUTH_CACHE", {})
 
     call_count = {"token": 0, "rates": 0}
 
@@ -331,6 +366,44 @@ def test_oauth_flow_fetches_token_and_reuses(monkeypatch: pytest.MonkeyPatch, tm
     assert call_count["rates"] == 2
 
 
+def test_oauth_token_cache_survives_restart(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    provider = ProviderSettings(
+        name="Proveedor OAuth",
+        endpoint="https://mock.local/rates",
+        mid_path="rates.DOP",
+        oauth_token_url="https://mock.local/token",
+        oauth_client_id_env="OAUTH_CLIENT_ID",
+        oauth_client_secret_env="OAUTH_CLIENT_SECRET",
+    )
+    cache_path = tmp_path / "oauth_tokens.json"
+    settings = Settings(providers=[provider], timezone="UTC", oauth_token_cache_path=cache_path)
+
+    monkeypatch.setenv("OAUTH_CLIENT_ID", "client-id")
+    monkeypatch.setenv("OAUTH_CLIENT_SECRET", "client-secret")
+    monkeypatch.setattr(ExchangeRateClient, "_OAUTH_CACHE", {})
+    monkeypatch.setattr(ExchangeRateClient, "_OAUTH_LOADED_PATHS", set())
+
+    token_calls: list[int] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if str(request.url) == provider.oauth_token_url:
+            token_calls.append(1)
+            return httpx.Response(200, json={"access_token": "persisted", "expires_in": 3600})
+        assert request.headers["Authorization"] == "Bearer persisted"
+        return httpx.Response(200, json={"rates": {"DOP": 58.4}})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as http_client:
+        ExchangeRateClient(settings, http_client=http_client).fetch_all()
+
+        # Simula un nuevo proceso: la caché en memoria está vacía.
+        monkeypatch.setattr(ExchangeRateClient, "_OAUTH_CACHE", {})
+        monkeypatch.setattr(ExchangeRateClient, "_OAUTH_LOADED_PATHS", set())
+        ExchangeRateClient(settings, http_client=http_client).fetch_all()
+
+    assert len(token_calls) == 1
+    assert cache_path.stat().st_mode & 0o777 == 0o600
+
+
 def test_parse_infodolar_html(tmp_path: Path) -> None:
     settings = Settings(
         db_path=tmp_path / "dummy.sqlite",
@@ -353,6 +426,26 @@ def test_parse_infodolar_html(tmp_path: Path) -> None:
     assert any(s.source == "Casa de Cambio XYZ" and s.buy_rate == pytest.approx(58.20, rel=1e-6) for s in snapshots)
 
 
+@pytest.mark.parametrize("charset", [None, "iso-8859-1"])
+def test_fetch_html_provider_honours_charset(tmp_path: Path, charset: str | None) -> None:
+    sample_html = (Path(__file__).resolve().parent / "data" / "infodolar_sample.html").read_text(encoding="utf-8")
+    sample_html = sample_html.replace("Banreservas", "Cibao Cambios Ñ")
+    content_type = "text/html" if charset is None else f"text/html; charset={charset}"
+    body = sample_html.encode(charset or "utf-8")
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(200, content=body, headers={"content-type": content_type})
+    )
+    provider = ProviderSettings(name="InfoDolar", endpoint="https://mock.local/infodolar", format="html")
+    settings = Settings(db_path=tmp_path / "dummy.sqlite", providers=[provider], timezone="UTC")
+
+    with httpx.Client(transport=transport) as http_client:
+        client = ExchangeRateClient(settings, http_client=http_client)
+        results = client.fetch_all()
+        client.close()
+
+    assert results[0].snapshots[0].source == "Cibao Cambios Ñ"
+
+
 def test_parse_infodolar_html_without_table(tmp_path: Path) -> None:
     settings = Settings(db_path=tmp_path / "dummy.sqlite", providers=[], timezone="UTC")
     client = ExchangeRateClient(settings)
@@ -363,6 +456,41 @@ def test_parse_infodolar_html_without_table(tmp_path: Path) -> None:
     assert snapshots == []
 
 
+def test_locate_rate_table_prefers_tagged_table(tmp_path: Path) -> None:
+    settings = Settings(db_path=tmp_path / "dummy.sqlite", providers=[], timezone="UTC")
+    client = ExchangeRateClient(settings)
+    html = (
+        "<table id='layout'></table>"
+        "<table data-name='dolar' id='secondary'></table>"
+        "<table id='Dolar'></table>"
+    )
+    tagged = client._locate_rate_table(HTMLParser(html))
+    fallback = client._locate_rate_table(HTMLParser("<table id='only'></table>"))
+    client.close()
+
+    assert tagged is not None and tagged.attributes["id"] == "Dolar"
+    assert fallback is not None and fallback.attributes["id"] == "only"
+
+
+@pytest.mark.parametrize(
+    ("raw_text", "expected"),
+    [
+        ("RD$ 58.10", 58.10),
+        ("58,20", 58.20),
+        ("$62.90 = $0.00", 62.90),
+        ("US$63.10 $0.10", 63.10),
+        ("5RD$8", 58.0),
+        ("61.", 61.0),
+        ("1.2.3", 1.2),
+        ("N/D", None),
+        ("= 58.10", None),
+        ("", None),
+    ],
+)
+def test_parse_price_variants(raw_text: str, expected: float | None) -> None:
+    assert ExchangeRateClient._parse_price(raw_text) == expected
+
+
 def test_fetch_provider_retries(monkeypatch: pytest.MonkeyPatch) -> None:
     provider = ProviderSettings(
         name="Proveedor intermitente",
@@ -385,11 +513,10 @@ def test_fetch_provider_retries(monkeypatch: pytest.MonkeyPatch) -> None:
 
     transport = httpx.MockTransport(handler)
 
-    monkeypatch.setattr(
-        ExchangeRateClient,
-        "_sleep_backoff",
-        staticmethod(lambda provider, attempt: attempts.append(0)),
-    )
+    async def _record_backoff(provider: ProviderSettings, attempt: int) -> None:
+        attempts.append(0)
+
+    monkeypatch.setattr(ExchangeRateClient, "_sleep_backoff", staticmethod(_record_backoff))
 
     with httpx.Client(transport=transport) as http_client:
         client = ExchangeRateClient(settings, http_client=http_client)
@@ -462,7 +589,7 @@ def test_fetch_provider_retries(monkeypatch: pytest.MonkeyPatch) -> None:
             def consume_metrics(self) -> list:  # type: ignore[override]
                 return []
 
-        repository = MarketRepository(settings.db_path)
+        repository = MarketRepository(settings.db_path, timezone=settings.timezone)
         service = MarketDataService(repository, settings)
         service.client.close()
         service.client = StubClient(settings, series)
@@ -496,7 +623,7 @@ def test_provider_metrics_persisted(settings: Settings, sample_providers: list[P
     transport = _transport_for(responses)
 
     settings_with_db = settings.model_copy(update={"db_path": tmp_path / "metrics.sqlite"})
-    repo = MarketRepository(settings_with_db.db_path)
+    repo = MarketRepository(settings_with_db.db_path, timezone=settings_with_db.timezone)
     service = MarketDataService(repo, settings_with_db)
     with httpx.Client(transport=transport) as http_client:
         service.client.close()
@@ -545,7 +672,7 @@ def test_provider_metrics_capture_failures(tmp_path: Path) -> None:
 
     transport = httpx.MockTransport(handler)
 
-    repo = MarketRepository(settings.db_path)
+    repo = MarketRepository(settings.db_path, timezone=settings.timezone)
     service = MarketDataService(repo, settings)
     with httpx.Client(transport=transport) as http_client:
         service.client.close()
@@ -573,7 +700,7 @@ def test_capture_market_records_error_samples(
     transport = _transport_for(responses)
 
     settings_with_db = settings.model_copy(update={"db_path": tmp_path / "errors.sqlite"})
-    repo = MarketRepository(settings_with_db.db_path)
+    repo = MarketRepository(settings_with_db.db_path, timezone=settings_with_db.timezone)
     service = MarketDataService(repo, settings_with_db)
     with httpx.Client(transport=transport) as http_client:
         service.client.close()
@@ -588,4 +715,46 @@ def test_capture_market_records_error_samples(
     for sample in samples:
         assert sample.delta_vs_weighted is None or isinstance(sample.delta_vs_weighted, float)
         assert sample.delta_vs_consensus is None or isinstance(sample.delta_vs_consensus, float)
-        assert sample.consensus_mid == pytest.approx(consensus.mid_rate, rel=1e-6)
\ No newline at end of file
+        assert sample.consensus_mid == pytest.approx(consensus.mid_rate, rel=1e-6)
+
+
+def test_capture_market_failure_leaves_no_partial_writes(
+    monkeypatch: pytest.MonkeyPatch,
+    settings: Settings,
+    tmp_path: Path,
+) -> None:
+    transport = _transport_for(_mock_responses(datetime.now(UTC)))
+    settings_with_db = settings.model_copy(update={"db_path": tmp_path / "partial.sqlite"})
+    repo = MarketRepository(settings_with_db.db_path, timezone=settings_with_db.timezone)
+    service = MarketDataService(repo, settings_with_db)
+
+    def _fail(_consensus: object) -> None:
+        raise RuntimeError("fallo al persistir el consenso")
+
+    monkeypatch.setattr(service, "_persist_consensus", _fail)
+    with httpx.Client(transport=transport) as http_client:
+        service.client.close()
+        service.client = ExchangeRateClient(settings_with_db, http_client=http_client)
+        with pytest.raises(RuntimeError):
+            service.capture_market()
+    service.close()
+
+    assert repo.iter_snapshots() == []
+    assert repo.list_provider_error_samples() == []
+    assert repo.list_consensus_snapshots() == []
+
+
+def test_sleep_backoff_caps_delay_and_adds_jitter(monkeypatch: pytest.MonkeyPatch) -> None:
+    delays: list[float] = []
+
+    async def _record_sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr("cambio_dollar.data_provider.asyncio.sleep", _record_sleep)
+    monkeypatch.setattr("cambio_dollar.data_provider.random.random", lambda: 0.5)
+    provider = ProviderSettings(name="Mock", endpoint="https://mock.local", backoff_seconds=0.5)
+
+    for attempt in (0, 3, 25):
+        asyncio.run(ExchangeRateClient._sleep_backoff(provider, attempt))
+
+    assert delays == pytest.approx([0.525, 4.025, 512.025])
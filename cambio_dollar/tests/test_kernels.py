@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Callable
+
+import numpy as np
+import pytest
+
+from cambio_dollar._kernels import _fit_line_compiled, _fit_line_loop, _fit_line_numpy, fit_line
+
+
+@pytest.mark.parametrize("kernel", [_fit_line_loop, _fit_line_numpy, fit_line])
+def test_fit_line_matches_polyfit(kernel: Callable[..., tuple[float, float, float]]) -> None:
+    rng = np.random.default_rng(7)
+    hours = np.sort(rng.uniform(0.0, 12.0, size=120))
+    mids = 58.4 + 0.03 * hours + rng.normal(0.0, 0.02, size=hours.size)
+
+    intercept, slope, std_error = kernel(hours, mids)
+
+    expected_slope, expected_intercept = np.polyfit(hours, mids, 1)
+    residuals = mids - (expected_intercept + expected_slope * hours)
+    assert slope == pytest.approx(expected_slope, rel=1e-9)
+    assert intercept == pytest.approx(expected_intercept, rel=1e-9)
+    assert std_error == pytest.approx(float(np.std(residuals)), rel=1e-6)
+
+
+@pytest.mark.parametrize("kernel", [_fit_line_loop, _fit_line_numpy])
+def test_fit_line_without_variance_is_flat(kernel: Callable[..., tuple[float, float, float]]) -> None:
+    hours = np.zeros(4)
+    mids = np.array([58.0, 58.2, 58.4, 58.6])
+
+    intercept, slope, std_error = kernel(hours, mids)
+
+    assert slope == 0.0
+    assert intercept == pytest.approx(58.3)
+    assert std_error == pytest.approx(float(np.std(mids)))
+
+
+@pytest.mark.skipif(_fit_line_compiled is None, reason="extensión _fitline no compilada")
+def test_compiled_fit_line_matches_python_loop() -> None:
+    rng = np.random.default_rng(11)
+    hours = np.sort(rng.uniform(0.0, 48.0, size=240))
+    mids = 58.4 - 0.01 * hours + rng.normal(0.0, 0.05, size=hours.size)
+
+    # Con -O3 el compilador puede contraer a FMA: se compara con tolerancia, no bit a bit.
+    assert _fit_line_compiled(hours, mids) == pytest.approx(_fit_line_loop(hours, mids), rel=1e-12)
+    assert fit_line(hours[::2], mids[::2]) == pytest.approx(
+        _fit_line_loop(hours[::2].copy(), mids[::2].copy()), rel=1e-12
+    )
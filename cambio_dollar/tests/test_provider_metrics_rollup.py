@@ -53,7 +53,7 @@ def _metric(
 
 
 def test_provider_reliability_rollup_persisted(reliability_settings: Settings) -> None:
-    repository = MarketRepository(reliability_settings.db_path)
+    repository = MarketRepository(reliability_settings.db_path, timezone=reliability_settings.timezone)
     aggregator = ProviderReliabilityAggregator(repository, reliability_settings)
     now = datetime.now(tz=UTC)
 
@@ -114,7 +114,7 @@ def test_provider_reliability_rollup_persisted(reliability_settings: Settings) -
 
 
 def test_provider_reliability_handles_empty_window(reliability_settings: Settings) -> None:
-    repository = MarketRepository(reliability_settings.db_path)
+    repository = MarketRepository(reliability_settings.db_path, timezone=reliability_settings.timezone)
     aggregator = ProviderReliabilityAggregator(repository, reliability_settings)
 
     now = datetime.now(tz=UTC)
@@ -144,7 +144,7 @@ def test_weight_calculator_penalizes_error(tmp_path: Path) -> None:
         weight_delta=0.5,
     )
 
-    repository = MarketRepository(settings.db_path)
+    repository = MarketRepository(settings.db_path, timezone=settings.timezone)
     aggregator = ProviderReliabilityAggregator(repository, settings)
     calculator = ProviderWeightCalculator(repository, settings)
 
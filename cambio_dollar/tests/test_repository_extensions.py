@@ -1,24 +1,32 @@
 from __future__ import annotations
 
-from datetime import UTC, datetime, timedelta
+import sqlite3
+from datetime import UTC, datetime, timedelta, timezone
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 from cambio_dollar.models import (
     AnomalyEvent,
     AnomalySeverity,
+    ConsensusSnapshotRecord,
+    DriftDirection,
+    DriftEvent,
+    DriftSeverity,
     ExternalMacroMetric,
     FeatureVectorRecord,
     ModelEvaluationRecord,
     PerformanceLabel,
+    ProviderErrorSample,
+    RateSnapshot,
 )
-from cambio_dollar.repository import MarketRepository
+from cambio_dollar.repository import _LATEST_BY_PROVIDER_SQL, MarketRepository
 
 
 @pytest.fixture()
 def repository(tmp_path: Path) -> MarketRepository:
-    return MarketRepository(tmp_path / "repo.sqlite")
+    return MarketRepository(tmp_path / "repo.sqlite", timezone="UTC")
 
 
 def test_feature_vector_filters_and_limit(repository: MarketRepository) -> None:
@@ -68,6 +76,40 @@ def test_feature_vector_filters_and_limit(repository: MarketRepository) -> None:
     assert limited[0].feature_version == "v2"
 
 
+def test_feature_matrix_stacks_payloads(repository: MarketRepository) -> None:
+    base = datetime(2025, 10, 8, 12, tzinfo=UTC)
+    for minutes, payload in [(3, {"lag_1": 0.1, "rsi": 50.0}), (2, {"lag_1": 0.2, "rsi": 52.0})]:
+        repository.save_feature_vector(
+            FeatureVectorRecord(
+                timestamp=base - timedelta(minutes=minutes),
+                feature_version="v1",
+                scope="consensus",
+                payload=payload,
+            )
+        )
+
+    fixed = repository.feature_matrix(feature_version="v1")
+    assert fixed.feature_names == ["lag_1", "rsi"]
+    assert fixed.values.tolist() == [[0.2, 52.0], [0.1, 50.0]]
+    assert fixed.timestamps == [base - timedelta(minutes=2), base - timedelta(minutes=3)]
+
+    repository.save_feature_vector(
+        FeatureVectorRecord(
+            timestamp=base,
+            feature_version="v1",
+            scope="consensus",
+            payload={"rsi": 54.0, "macd": -0.3},
+        )
+    )
+    mixed = repository.feature_matrix(feature_version="v1")
+    assert mixed.feature_names == ["rsi", "macd", "lag_1"]
+    assert mixed.values[0].tolist()[:2] == [54.0, -0.3]
+    assert np.isnan(mixed.values[0, 2])
+    assert np.isnan(mixed.values[1:, 1]).all()
+
+    assert repository.feature_matrix(feature_version="v9").values.shape == (0, 0)
+
+
 def test_performance_labels_filters(repository: MarketRepository) -> None:
     base = datetime(2025, 10, 8, 13, tzinfo=UTC)
     win_label = PerformanceLabel(
@@ -208,3 +250,320 @@ def test_anomaly_events_persistence(repository: MarketRepository) -> None:
     recent = repository.list_anomalies(since=timestamp - timedelta(minutes=3))
     assert len(recent) == 1
     assert recent[0].provider == "Banco Outlier"
+
+
+def test_save_snapshots_in_bulk(repository: MarketRepository) -> None:
+    timestamp = datetime(2025, 10, 8, 17, tzinfo=UTC)
+    snapshots = [
+        RateSnapshot(
+            timestamp=timestamp + timedelta(minutes=index),
+            buy_rate=58.10 + index / 100,
+            sell_rate=58.60 + index / 100,
+            source=f"Banco {index}",
+            confidence=0.9,
+        )
+        for index in range(3)
+    ]
+
+    repository.save_snapshots(snapshots)
+    repository.save_snapshots([])
+
+    stored = list(repository.iter_snapshots())
+    assert [snapshot.source for snapshot in stored] == ["Banco 2", "Banco 1", "Banco 0"]
+    assert repository.get_latest_snapshot().buy_rate == pytest.approx(58.12)
+
+    ascending = repository.iter_snapshots(ascending=True)
+    assert [snapshot.source for snapshot in ascending] == ["Banco 0", "Banco 1", "Banco 2"]
+
+
+def test_connections_use_wal_journal(repository: MarketRepository) -> None:
+    with repository._connection() as conn:
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+
+
+def test_iter_consensus_snapshots_streams_in_chunks(repository: MarketRepository) -> None:
+    base = datetime(2025, 10, 8, 12, tzinfo=UTC)
+    for minute in (20, 0, 10, 40, 30):
+        repository.save_consensus_snapshot(
+            ConsensusSnapshotRecord(
+                timestamp=base + timedelta(minutes=minute),
+                buy_rate=58.1,
+                sell_rate=58.6,
+                mid_rate=58.35,
+                divergence_range=0.1,
+                provider_count=3,
+            )
+        )
+
+    streamed = list(repository.iter_consensus_snapshots(since=base + timedelta(minutes=10), chunk_size=2))
+
+    assert [record.timestamp.minute for record in streamed] == [10, 20, 30, 40]
+    assert streamed == repository.list_consensus_snapshots(since=base + timedelta(minutes=10), desc=False)
+
+    bounded = repository.iter_consensus_snapshots(latest=2, chunk_size=1)
+    assert [record.timestamp.minute for record in bounded] == [30, 40]
+
+
+def test_snapshot_table_matches_latest_by_provider(repository: MarketRepository) -> None:
+    assert len(repository.snapshot_table()) == 0
+
+    timestamp = datetime(2025, 10, 8, 17, tzinfo=UTC)
+    repository.save_snapshots(
+        RateSnapshot(
+            timestamp=timestamp + timedelta(minutes=index),
+            buy_rate=58.0 + index / 10,
+            sell_rate=58.5 + index / 10,
+            source=source,
+            confidence=0.9,
+        )
+        for index, source in enumerate(["Banco A", "Banco B", "Banco A"])
+    )
+
+    table = repository.snapshot_table()
+    latest = repository.latest_by_provider()
+    assert table.providers == list(latest)
+    assert table.buy.tolist() == [snapshot.buy_rate for snapshot in latest.values()]
+    assert table.sell.tolist() == [snapshot.sell_rate for snapshot in latest.values()]
+    assert table.mid.tolist() == [snapshot.mid_rate for snapshot in latest.values()]
+    assert table.timestamps == [snapshot.timestamp for snapshot in latest.values()]
+
+
+def test_latest_by_provider_uses_covering_index(repository: MarketRepository) -> None:
+    with repository._connection() as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN " + _LATEST_BY_PROVIDER_SQL).fetchall()
+    details = " ".join(row["detail"] for row in plan)
+    assert "COVERING INDEX idx_rate_snapshots_source_ts_covering" in details
+    # Búsquedas por fuente sobre el índice, nunca un recorrido del histórico completo.
+    assert "SCAN rate_snapshots" not in details
+
+
+def test_drift_events_store_epoch_timestamps(tmp_path: Path) -> None:
+    repository = MarketRepository(tmp_path / "drift.sqlite", timezone="America/Santo_Domingo")
+    local = timezone(timedelta(hours=-4))
+    moments = [
+        datetime(2025, 10, 8, 9, 30, 0, 250_000, tzinfo=local),
+        datetime(2025, 10, 8, 14, 0, tzinfo=UTC),
+    ]
+    repository.record_drift_events(
+        DriftEvent(
+            timestamp=moment,
+            direction=DriftDirection.UP,
+            metric="mid_rate",
+            value=58.5,
+            ewma=58.4,
+            threshold=0.5,
+            cusum_pos=0.6,
+            cusum_neg=0.0,
+            severity=DriftSeverity.LOW,
+        )
+        for moment in moments
+    )
+
+    with repository._connection() as conn:
+        stored = conn.execute("SELECT typeof(timestamp) FROM drift_events").fetchall()
+    assert {row[0] for row in stored} == {"integer"}
+
+    # 09:30-04:00 es 13:30 UTC: el filtro compara instantes, no texto ISO.
+    since = datetime(2025, 10, 8, 13, 15, tzinfo=UTC)
+    assert len(repository.list_drift_events(since=since)) == 2
+    assert len(repository.list_drift_events(since=since + timedelta(minutes=30))) == 1
+
+    latest_first = repository.list_drift_events()
+    assert [event.timestamp for event in latest_first] == moments[::-1]
+    assert latest_first[1].timestamp.utcoffset() == timedelta(hours=-4)
+    assert latest_first[1].timestamp.microsecond == 250_000
+
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [
+        ('{"weights": {"Banco A": 0.6}}', {"weights": {"Banco A": 0.6}}),
+        ('{"zscore": Infinity}', {"zscore": float("inf")}),
+        ("{no es json", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_load_json_metadata(raw: str | None, expected: dict | None) -> None:
+    assert MarketRepository._load_json(raw) == expected
+
+
+def test_iter_snapshots_shares_provider_names(repository: MarketRepository) -> None:
+    timestamp = datetime(2025, 10, 8, 17, tzinfo=UTC)
+    repository.save_snapshots(
+        RateSnapshot(
+            timestamp=timestamp + timedelta(minutes=index),
+            buy_rate=58.0,
+            sell_rate=58.5,
+            source="Banco A",
+            confidence=0.9,
+        )
+        for index in range(3)
+    )
+
+    snapshots = repository.iter_snapshots()
+    assert len({id(snapshot.source) for snapshot in snapshots}) == 1
+
+
+def test_connection_is_reused_until_close(repository: MarketRepository) -> None:
+    with repository._connection() as first, repository._connection() as second:
+        assert first is second
+
+    with pytest.raises(RuntimeError):
+        with repository._connection() as conn:
+            conn.execute(
+                "INSERT INTO rate_snapshots (timestamp, buy_rate, sell_rate, source, confidence) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (datetime(2025, 10, 8, 17, tzinfo=UTC).isoformat(), 58.0, 58.5, "Banco A", 0.9),
+            )
+            raise RuntimeError("fallo a mitad de escritura")
+    assert repository.iter_snapshots() == []
+
+    repository.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+    with repository._connection() as reopened:
+        assert reopened is not first
+
+
+def test_transaction_commits_or_rolls_back_as_one(repository: MarketRepository) -> None:
+    def snapshot(minute: int) -> RateSnapshot:
+        return RateSnapshot(
+            timestamp=datetime(2025, 10, 8, 17, minute, tzinfo=UTC),
+            buy_rate=58.0,
+            sell_rate=58.5,
+            source="Banco A",
+            confidence=0.9,
+        )
+
+    with pytest.raises(RuntimeError):
+        with repository.transaction():
+            repository.save_snapshot(snapshot(0))
+            repository.save_snapshot(snapshot(1))
+            raise RuntimeError("captura abortada")
+    assert repository.iter_snapshots() == []
+
+    with repository.transaction():
+        repository.save_snapshot(snapshot(0))
+        with repository.transaction():
+            repository.save_snapshot(snapshot(1))
+    assert len(repository.iter_snapshots()) == 2
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "SELECT * FROM rate_snapshots ORDER BY timestamp DESC LIMIT 10",
+        "SELECT * FROM trades ORDER BY timestamp DESC",
+        "SELECT * FROM feature_store WHERE scope = 'x' AND feature_version = 'v1' "
+        "ORDER BY snapshot_timestamp DESC LIMIT 10",
+        "SELECT * FROM provider_fetch_metrics WHERE provider = 'Banco A' ORDER BY timestamp DESC",
+        "SELECT * FROM model_evaluations WHERE model_name = 'm' AND model_version = '1' "
+        "AND metric_name = 'mae' ORDER BY recorded_at DESC",
+    ],
+)
+def test_list_queries_avoid_sorting(repository: MarketRepository, query: str) -> None:
+    with repository._connection() as conn:
+        plan = conn.execute("EXPLAIN QUERY PLAN " + query).fetchall()
+    details = " ".join(row["detail"] for row in plan)
+    assert "USING INDEX" in details
+    assert "TEMP B-TREE" not in details
+
+
+@pytest.mark.parametrize("ascending", [False, True])
+def test_iter_snapshots_stream_matches_list(repository: MarketRepository, ascending: bool) -> None:
+    timestamp = datetime(2025, 10, 8, 17, tzinfo=UTC)
+    repository.save_snapshots(
+        RateSnapshot(
+            timestamp=timestamp + timedelta(minutes=index),
+            buy_rate=58.0 + index / 100,
+            sell_rate=58.5 + index / 100,
+            source=f"Banco {index % 3}",
+            confidence=0.9,
+        )
+        for index in range(25)
+    )
+
+    since = timestamp + timedelta(minutes=5)
+    stream = repository.iter_snapshots_stream(since=since, ascending=ascending, chunk_size=4)
+    assert not isinstance(stream, list)
+    assert list(stream) == repository.iter_snapshots(since=since, ascending=ascending)
+
+
+def test_save_snapshots_keeps_revised_rates(repository: MarketRepository) -> None:
+    timestamp = datetime(2025, 10, 8, tzinfo=UTC)
+    first = RateSnapshot(timestamp=timestamp, buy_rate=58.0, sell_rate=58.5, source="Banco A", confidence=0.9)
+    same_table_row = first.model_copy(update={"sell_rate": 58.7})
+    revised = first.model_copy(update={"buy_rate": 58.2})
+
+    repository.save_snapshots([first, same_table_row])
+    repository.save_snapshot(revised)
+
+    stored = repository.iter_snapshots(ascending=True)
+    assert [(snapshot.buy_rate, snapshot.sell_rate) for snapshot in stored] == [
+        (58.0, 58.5),
+        (58.0, 58.7),
+        (58.2, 58.5),
+    ]
+    assert repository.latest_by_provider()["Banco A"].buy_rate == 58.2
+
+
+def test_save_snapshots_ignores_identical_repeat(repository: MarketRepository) -> None:
+    snapshot = RateSnapshot(
+        timestamp=datetime(2025, 10, 8, tzinfo=UTC),
+        buy_rate=58.0,
+        sell_rate=58.5,
+        source="Banco A",
+        confidence=0.9,
+    )
+    repository.save_snapshot(snapshot)
+    with repository._connection() as conn:
+        changes_before = conn.total_changes
+
+    repository.save_snapshot(snapshot.model_copy())
+
+    with repository._connection() as conn:
+        assert conn.total_changes == changes_before
+    assert len(repository.iter_snapshots()) == 1
+
+
+def test_error_samples_can_skip_metadata(repository: MarketRepository) -> None:
+    sample = ProviderErrorSample(
+        timestamp=datetime(2025, 10, 8, 17, tzinfo=UTC),
+        provider="Banco A",
+        delta_vs_weighted=0.12,
+        consensus_mid=58.4,
+        metadata={"abs_delta": 0.12},
+    )
+    repository.record_provider_error_samples([sample])
+
+    full = repository.list_provider_error_samples(provider="Banco A")
+    light = repository.list_provider_error_samples(provider="Banco A", include_metadata=False)
+
+    assert full[0].metadata == {"abs_delta": 0.12}
+    assert light[0].metadata is None
+    assert light[0].model_dump(exclude={"metadata"}) == full[0].model_dump(exclude={"metadata"})
+
+
+def test_epoch_columns_reject_naive_timestamps(repository: MarketRepository) -> None:
+    event = DriftEvent(
+        timestamp=datetime(2025, 10, 8, 9, 30),
+        direction=DriftDirection.UP,
+        metric="mid_rate",
+        value=58.5,
+        ewma=58.4,
+        threshold=0.5,
+        cusum_pos=0.6,
+        cusum_neg=0.0,
+        severity=DriftSeverity.LOW,
+    )
+
+    with pytest.raises(ValueError):
+        repository.record_drift_events([event])
+    with pytest.raises(ValueError):
+        repository.list_drift_events(since=datetime(2025, 10, 8))
+    assert repository.list_drift_events() == []
@@ -24,7 +24,7 @@ def web_app(tmp_path: Path) -> TestClient:
         ],
     )
 
-    repository = MarketRepository(settings.db_path)
+    repository = MarketRepository(settings.db_path, timezone=settings.timezone)
     now = datetime.now(UTC)
     for idx in range(6):
         ts = now - timedelta(minutes=idx * 15)